@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import sqlite3
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from taskmanager import (  # noqa: E402
+    PRIORITIES, TaskFilter, DatabaseManager, Profiler, import_csv_file, export_csv_file
+)
+from taskmanager.csv_io import write_csv  # noqa: E402
+from main import TaskTableModel  # noqa: E402
+
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+WORDS = ['отчет', 'встреча', 'звонок', 'договор', 'релиз', 'проверка', 'план', 'счет',
+         'report', 'review', 'deploy', 'invoice', 'backup', 'design', 'meeting', 'budget']
+
+
+def query_count(profiler):
+    # Число выполненных SQL-операторов по замерам InstrumentedCursor (включая рабочие потоки).
+    # Операторы триггеров не считаются, а параметры запросов не раскрываются в текст
+    histogram = profiler.histograms.get('query')
+    return histogram.total_count if histogram is not None else 0
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def random_task(rng, user_id):
+    title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 30)))
+    deadline = f'{rng.randint(2020, 2026)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+    return user_id, title, description, deadline, rng.randrange(len(PRIORITIES))
+
+
+def generate(db_manager, scale, noise_users, rng):
+    # Синтетические пользователи и задачи; основной пользователь получает scale задач
+    user_ids = []
+    for number in range(noise_users + 1):
+        db_manager.add_user(f'bench{number}', 'bench')
+        user_ids.append(db_manager.get_user_id(f'bench{number}'))
+
+    conn = db_manager.conn
+    for user_id, count in [(user_ids[0], scale)] + [(user_id, scale // 10) for user_id in user_ids[1:]]:
+        for start in range(0, count, 10000):
+            conn.executemany(
+                'INSERT INTO tasks (user_id, title, description, deadline, priority) VALUES (?, ?, ?, ?, ?)',
+                [random_task(rng, user_id) for _ in range(min(10000, count - start))]
+            )
+    # Хеши содержимого как у задач, добавленных через приложение: дубликаты остаются без хеша
+    conn.execute('UPDATE OR IGNORE tasks SET content_hash = task_hash(title, description, deadline)')
+    conn.commit()
+    return user_ids[0]
+
+
+def run_scale(scale, args, work_dir):
+    rng = random.Random(args.seed)
+    db_path = os.path.join(work_dir, f'bench_{scale}.db')
+    # Порог медленной операции бесконечен: замеры нужны только для подсчета операторов
+    db_manager = DatabaseManager(db_path, profiler=Profiler(slow_threshold_ms=float('inf')))
+    model = TaskTableModel(db_manager)
+    results = []
+
+    def measure(operation, function):
+        # С --memory для каждой операции считается пик памяти Python сверх занятой до ее начала (tracemalloc);
+        # память самого SQLite в него не входит
+        queries = query_count(db_manager.profiler)
+        if args.memory:
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        function()
+        result = {
+            'scale': scale,
+            'operation': operation,
+            'seconds': round(time.perf_counter() - started, 6),
+            'queries': query_count(db_manager.profiler) - queries,
+        }
+        if args.memory:
+            result['peak_alloc_kb'] = (tracemalloc.get_traced_memory()[1] - allocated) // 1024
+        results.append(result)
+
+    state = {}
+
+    def generate_data():
+        state['user_id'] = generate(db_manager, scale, args.noise_users, rng)
+
+    measure('generate', generate_data)
+    user_id = state['user_id']
+
+    def scroll():
+        for _ in range(10):
+            model.fetchMore()
+
+    measure('load_first_page', lambda: model.load(user_id))
+    measure('load_scroll_10_pages', scroll)
+
+    filters = {
+        'filter_text': TaskFilter(text='отч'),
+        'filter_priority': TaskFilter(priority=2),
+        'filter_deadline': TaskFilter(start_date='2023-01-01', end_date='2023-03-31'),
+        'filter_combined': TaskFilter(text='rep', priority=0,
+                                      start_date='2021-01-01', end_date='2024-12-31'),
+    }
+    for operation, task_filter in filters.items():
+        measure(operation, lambda task_filter=task_filter: model.load(user_id, task_filter))
+        measure(operation + '_count', lambda task_filter=task_filter: db_manager.count_tasks(user_id, task_filter))
+
+    sorts = {
+        'sort_deadline': (TaskTableModel.SORT_COLUMNS.index('deadline'), False),
+        'sort_priority_desc': (TaskTableModel.SORT_COLUMNS.index('priority'), True),
+        'sort_title': (TaskTableModel.SORT_COLUMNS.index('title'), False),
+    }
+    for operation, (column, descending) in sorts.items():
+        model.set_sort(column, descending)
+        measure(operation, lambda: model.load(user_id))
+        measure(operation + '_scroll_10_pages', scroll)
+    model.set_sort(None, False)
+
+    model.load(user_id)
+    sample = min(args.mutations, model.rowCount())
+
+    def edit():
+        for row in range(sample):
+            task_id, title, _, deadline, priority = model.task_at(row)
+            description = model.full_description(row)
+            db_manager.update_task(task_id, user_id, title + ' *', description, deadline, priority)
+            model.update_task_row(row, (task_id, title + ' *', description, deadline, priority))
+
+    def delete():
+        for _ in range(sample):
+            task_id = model.task_at(0)[0]
+            db_manager.delete_task(task_id, user_id)
+            model.remove_task_row(0)
+
+    measure(f'edit_{sample}', edit)
+    measure(f'delete_{sample}', delete)
+
+    export_path = os.path.join(work_dir, f'export_{scale}.csv')
+    measure('export_csv', lambda: export_csv_file(db_manager, export_path, user_id))
+
+    import_path = os.path.join(work_dir, f'import_{scale}.csv')
+    with open(import_path, 'w', newline='', encoding='utf-8') as file:
+        write_csv(file, [[random_task(rng, None)[1:] for _ in range(scale)]])
+    db_manager.add_user('bench_import', 'bench')
+    import_user_id = db_manager.get_user_id('bench_import')
+    measure('import_csv', lambda: import_csv_file(db_manager, import_path, import_user_id))
+    measure('reimport_csv', lambda: import_csv_file(db_manager, import_path, import_user_id))
+
+    db_manager.close()
+    results.append({
+        'scale': scale,
+        'operation': 'database_size',
+        'bytes': os.path.getsize(db_path),
+    })
+    return results
+
+
+def compare(results, baseline_path):
+    # Сравнение с результатами предыдущего запуска: отношение времени текущего к базовому
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {
+            (item['scale'], item['operation']): item['seconds']
+            for item in json.load(file)['results'] if 'seconds' in item
+        }
+    lines = []
+    for item in results:
+        base = baseline.get((item['scale'], item['operation']))
+        if base and 'seconds' in item:
+            ratio = item['seconds'] / base
+            marker = '  <-- медленнее' if ratio > 1.2 else ''
+            lines.append(f'{item["scale"]:>8} {item["operation"]:<24} {base:>10.4f} {item["seconds"]:>10.4f} '
+                         f'{ratio:>6.2f}x{marker}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры масштабируемости операций менеджера задач')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help='количества задач основного пользователя (например, 1000 10000 100000 1000000)')
+    parser.add_argument('--noise-users', type=int, default=3, help='пользователи с фоновыми задачами (scale/10 каждый)')
+    parser.add_argument('--mutations', type=int, default=100, help='число правок и удалений')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='файл для результатов в JSON (по умолчанию стандартный вывод)')
+    parser.add_argument('--compare', help='JSON предыдущего запуска для сравнения')
+    parser.add_argument('--keep', action='store_true', help='не удалять временные базы и файлы')
+    parser.add_argument('--memory', action='store_true',
+                        help='замерять пиковую память каждой операции (tracemalloc замедляет код на Python)')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])  # noqa: F841 (моделям Qt нужен экземпляр приложения)
+    work_dir = tempfile.mkdtemp(prefix='taskmanager-bench-')
+    results = []
+    if args.memory:
+        tracemalloc.start()
+    try:
+        for scale in args.scales:
+            results.extend(run_scale(scale, args, work_dir))
+    finally:
+        if not args.keep:
+            for name in os.listdir(work_dir):
+                os.remove(os.path.join(work_dir, name))
+            os.rmdir(work_dir)
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        print(compare(results, args.compare), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
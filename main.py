@@ -1,14 +1,171 @@
+import os
 import sys
 import csv
+import time
+import logging
+import datetime
+import functools
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QTableWidget,
-    QTableWidgetItem, QLineEdit, QTextEdit, QComboBox, QDateEdit, QHeaderView,
-    QDialog, QFormLayout, QFileDialog, QToolBar, QAction, QMessageBox, QSplashScreen
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableView, QCheckBox,
+    QLineEdit, QTextEdit, QComboBox, QDateEdit, QHeaderView, QAbstractItemView,
+    QDialog, QFormLayout, QFileDialog, QToolBar, QAction, QMessageBox, QSplashScreen,
+    QProgressDialog, QPlainTextEdit, QShortcut, QSystemTrayIcon, QStyle
+)
+from PyQt5.QtGui import QPixmap, QKeySequence, QFontDatabase
+from PyQt5.QtCore import (
+    Qt, QDate, QTimer, QEventLoop, QAbstractTableModel, QModelIndex, QThread, QObject, pyqtSignal
 )
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt, QDate, QTimer
 import sqlite3
 
+from taskmanager import (
+    PRIORITIES, DESCRIPTION_PREVIEW_CHARS, OperationCancelled, TaskFilter, DatabaseManager, Profiler,
+    ReminderQueue, import_csv_file, export_csv_file, backup_database, restore_database
+)
+
+
+logger = logging.getLogger('taskmanager')
+
+
+def profiled(name):
+    # Замер длительности обработчика интерфейса, если у DatabaseManager включено профилирование
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.db_manager.profiler
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            with profiler.measure('ui', name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def warn_write_failed(parent, db_manager, error):
+    # Ошибка записи в потоке интерфейса (например, база надолго заблокирована импортом или восстановлением
+    # в другом экземпляре приложения): незавершенная транзакция откатывается, пользователь видит предупреждение
+    db_manager.conn.rollback()
+    QMessageBox.warning(parent, 'Ошибка', f'Не удалось сохранить изменения: {error}')
+
+
+class StallMonitor(QObject):
+    INTERVAL_MS = 50
+    MIN_STALL_MS = 20
+
+    def __init__(self, profiler, parent=None):
+        # Таймер-пульс: опоздание срабатывания означает, что цикл событий был занят
+        super().__init__(parent)
+        self.profiler = profiler
+        self.last_tick = time.perf_counter()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(self.INTERVAL_MS)
+
+    def tick(self):
+        now = time.perf_counter()
+        stall_ms = (now - self.last_tick) * 1000 - self.INTERVAL_MS
+        self.last_tick = now
+        if stall_ms >= self.MIN_STALL_MS:
+            self.profiler.record('stall', 'цикл событий', stall_ms)
+
+
+class ReminderScheduler(QObject):
+    reminders_due = pyqtSignal(list)
+
+    # Предел ожидания одного срабатывания: после сна системы или перевода часов таймер перевзводится
+    MAX_WAIT_MS = 60 * 60 * 1000
+
+    def __init__(self, db_manager, parent=None):
+        # Один таймер, взведенный на ближайший срок, вместо периодического опроса таблицы задач
+        super().__init__(parent)
+        self.queue = ReminderQueue(db_manager)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire)
+
+    def start(self, user_id):
+        self.queue.load(user_id)
+        self.arm()
+
+    def arm(self):
+        due = self.queue.next_due()
+        if due is None:
+            self.timer.stop()
+            return
+        wait_ms = int((due - datetime.datetime.now()).total_seconds() * 1000)
+        self.timer.start(min(max(wait_ms, 0), self.MAX_WAIT_MS))
+
+    def fire(self):
+        due = self.queue.pop_due(datetime.datetime.now())
+        if due:
+            self.reminders_due.emit(due)
+        self.arm()
+
+    def task_added(self, task_id, title, deadline):
+        self.queue.add(task_id, title, deadline)
+        self.arm()
+
+    def task_changed(self, task_id, title, deadline):
+        self.queue.update(task_id, title, deadline)
+        self.arm()
+
+    def task_removed(self, task_id):
+        self.queue.remove(task_id)
+        self.arm()
+
+
+class ChangeWatcher(QObject):
+    tasks_changed = pyqtSignal(list)
+    reload_required = pyqtSignal()
+
+    POLL_INTERVAL_MS = 1000
+    # При большем числе изменений (например, импорт в другом окне) дешевле перезагрузить список
+    MAX_CHANGES = 1000
+
+    def __init__(self, db_manager, parent=None):
+        # Отслеживание изменений, сделанных другими экземплярами приложения с той же базой:
+        # PRAGMA data_version опрашивается по таймеру, а изменившиеся задачи берутся из журнала изменений
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.user_id = None
+        self.data_version = None
+        self.schema_cookie = None
+        self.change_id = 0
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self, user_id):
+        self.user_id = user_id
+        self.data_version = self.db_manager.data_version()
+        self.schema_cookie = self.db_manager.schema_cookie()
+        self.change_id = self.db_manager.last_change_id()
+        self.timer.start(self.POLL_INTERVAL_MS)
+
+    @profiled('проверка изменений')
+    def poll(self):
+        version = self.db_manager.data_version()
+        if version == self.data_version:
+            return
+        self.data_version = version
+        # Восстановление из снимка заменяет базу вместе с журналом изменений, и курсор по журналу теряет смысл:
+        # курсор переставляется, а список перезагружается
+        schema_cookie = self.db_manager.schema_cookie()
+        if schema_cookie != self.schema_cookie:
+            self.schema_cookie = schema_cookie
+            self.change_id = self.db_manager.last_change_id()
+            self.reload_required.emit()
+            return
+        # Курсор сдвигается до последней записи журнала, прочитанной до выборки, чтобы не пропустить
+        # изменения, зафиксированные во время самой выборки
+        last_change_id = self.db_manager.last_change_id()
+        task_ids = self.db_manager.changed_task_ids(self.user_id, self.change_id, last_change_id,
+                                                   self.MAX_CHANGES + 1)
+        self.change_id = last_change_id
+        if len(task_ids) > self.MAX_CHANGES:
+            self.reload_required.emit()
+        elif task_ids:
+            self.tasks_changed.emit(task_ids)
+
 
 class SplashScreen(QSplashScreen):
     def __init__(self, pixmap):
@@ -24,80 +181,440 @@ class SplashScreen(QSplashScreen):
             (screen_geometry.height() - splash_geometry.height()) // 2
         )
 
-        # Закрытие SplashScreen через 3 секунды
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.close)
-        self.timer.start(3000)
-
-
-class DatabaseManager:
-    def __init__(self):
-        self.conn = sqlite3.connect('tasks.db')
-        self.cur = self.conn.cursor()
-        self.create_user_table()
-        self.create_task_table()
-
-    def create_user_table(self):
-        # Создание таблицы пользователей
-        self.cur.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT
-            )
-        ''')
-        self.conn.commit()
-
-    def create_task_table(self):
-        # Создание таблицы задач
-        self.cur.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                title TEXT,
-                description TEXT,
-                deadline DATE,
-                priority TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id)
+
+class DescriptionCache:
+    MAX_ITEMS = 256
+    MAX_CHARS = 2_000_000
+
+    def __init__(self, db_manager):
+        # LRU-кэш полных описаний недавно просмотренных задач, ограниченный числом записей и общим объемом
+        self.db_manager = db_manager
+        self.items = OrderedDict()
+        self.chars = 0
+
+    def get(self, user_id, task_id):
+        description = self.items.get(task_id)
+        if description is not None:
+            self.items.move_to_end(task_id)
+            return description
+        description = self.db_manager.get_description(task_id, user_id) or ''
+        self.put(task_id, description)
+        return description
+
+    def put(self, task_id, description):
+        self.discard(task_id)
+        self.items[task_id] = description
+        self.chars += len(description)
+        while len(self.items) > self.MAX_ITEMS or (self.chars > self.MAX_CHARS and len(self.items) > 1):
+            _, evicted = self.items.popitem(last=False)
+            self.chars -= len(evicted)
+
+    def discard(self, task_id):
+        description = self.items.pop(task_id, None)
+        if description is not None:
+            self.chars -= len(description)
+
+    def clear(self):
+        self.items.clear()
+        self.chars = 0
+
+
+class TaskTableModel(QAbstractTableModel):
+    HEADERS = ['Заголовок', 'Описание', 'Срок', 'Приоритет']
+    # Столбцы базы, по которым сортируются столбцы таблицы (описание не сортируется)
+    SORT_COLUMNS = ['title', None, 'deadline', 'priority']
+    DESCRIPTION_COLUMN = 1
+    PRIORITY_COLUMN = 3
+    PAGE_SIZE = 200
+    TOOLTIP_CHARS = 2000
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.user_id = None
+        self.task_filter = None
+        self.sort = None
+        self.tasks = []
+        self.after = None
+        self.exhausted = True
+        self.descriptions = DescriptionCache(db_manager)
+
+    def load(self, user_id, task_filter=None):
+        # Сброс модели и загрузка первой страницы задач
+        self.show_page(user_id, task_filter, [], None, user_id is None)
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def is_sortable(self, column):
+        return self.SORT_COLUMNS[column] is not None
+
+    def set_sort(self, column, descending):
+        # Сортировка выполняется в базе (ORDER BY по индексу) и применяется при следующей загрузке;
+        # column=None возвращает исходный порядок
+        self.sort = (self.SORT_COLUMNS[column], descending) if column is not None else None
+
+    @profiled('заполнение таблицы')
+    def show_page(self, user_id, task_filter, tasks, after, exhausted):
+        # Замена содержимого модели готовой первой страницей (например, полученной в фоновом потоке)
+        self.beginResetModel()
+        if user_id != self.user_id:
+            self.descriptions.clear()
+        self.user_id = user_id
+        self.task_filter = task_filter
+        self.tasks = list(tasks)
+        self.after = after
+        self.exhausted = exhausted
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tasks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ToolTipRole and index.column() == self.DESCRIPTION_COLUMN:
+            # Полное описание читается из базы только при наведении и остается в кэше
+            description = self.full_description(index.row())
+            if len(description) > self.TOOLTIP_CHARS:
+                description = description[:self.TOOLTIP_CHARS] + '…'
+            return description or None
+        if role != Qt.DisplayRole:
+            return None
+        value = self.tasks[index.row()][index.column() + 1]
+        if index.column() == self.PRIORITY_COLUMN:
+            return PRIORITIES[value]
+        if index.column() == self.DESCRIPTION_COLUMN:
+            # В строке таблицы показывается первая строка начала описания (в старых базах описание может быть NULL)
+            if value is None:
+                return ''
+            first_line = value.split('\n', 1)[0]
+            truncated = len(first_line) < len(value) or len(value) >= DESCRIPTION_PREVIEW_CHARS
+            return first_line + '…' if truncated else first_line
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    @profiled('подгрузка страницы')
+    def fetchMore(self, parent=QModelIndex()):
+        # Подгрузка следующей страницы задач по мере прокрутки
+        if parent.isValid() or self.exhausted:
+            return
+        page, self.after = self.db_manager.fetch_tasks_page(
+            self.user_id, self.task_filter, self.after, self.PAGE_SIZE, self.sort
+        )
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.tasks), len(self.tasks) + len(page) - 1)
+            self.tasks.extend(page)
+            self.endInsertRows()
+
+    def task_at(self, row):
+        # Получение данных задачи (id, заголовок, начало описания, срок, приоритет) по номеру строки
+        return self.tasks[row]
+
+    def full_description(self, row):
+        return self.descriptions.get(self.user_id, self.tasks[row][0])
+
+    def list_row(self, task):
+        # Строка списка хранит только начало описания; полное описание кладется в кэш
+        task_id, title, description, deadline, priority = task
+        description = description or ''
+        self.descriptions.put(task_id, description)
+        return task_id, title, description[:DESCRIPTION_PREVIEW_CHARS], deadline, priority
+
+    def row_of(self, task_id):
+        # Номер строки задачи или -1, если она не загружена
+        for row, task in enumerate(self.tasks):
+            if task[0] == task_id:
+                return row
+        return -1
+
+    def append_task(self, task):
+        # Добавление новой задачи без перезагрузки
+        if self.user_id is not None:
+            self.insert_row(self.list_row(task))
+
+    def insert_row(self, task):
+        # Вставка строки списка на ее место. Пока не все страницы загружены,
+        # задача с наибольшим id придет вместе со следующей страницей
+        if self.sort is not None:
+            self.insert_sorted_task(task)
+        elif self.db_manager.is_ranked(self.task_filter):
+            # В снимке ранжирования новой задачи нет, и со страницами она не придет: строка добавляется
+            # после загруженных. Задача из еще не загруженной части снимка придет со своей страницей
+            if self.after is None or task[0] not in self.after[0]:
+                self.beginInsertRows(QModelIndex(), len(self.tasks), len(self.tasks))
+                self.tasks.append(task)
+                self.endInsertRows()
+        elif self.exhausted:
+            self.beginInsertRows(QModelIndex(), len(self.tasks), len(self.tasks))
+            self.tasks.append(task)
+            self.endInsertRows()
+
+    def insert_sorted_task(self, task):
+        # Вставка в позицию по ключу сортировки; задача за ключом последней загруженной строки
+        # придет со следующими страницами
+        column, descending = self.sort
+        index = self.db_manager.SORT_COLUMNS[column]
+        key = (task[index], task[0])
+
+        def before(other):
+            return other > key if descending else other < key
+
+        if not self.exhausted and self.after is not None and before(tuple(self.after)):
+            return
+        row = 0
+        while row < len(self.tasks) and before((self.tasks[row][index], self.tasks[row][0])):
+            row += 1
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.tasks.insert(row, task)
+        self.endInsertRows()
+
+    def update_task_row(self, row, task):
+        # Замена данных одной строки с обновлением только ее ячеек
+        self.tasks[row] = self.list_row(task)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def remove_task_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.descriptions.discard(self.tasks[row][0])
+        del self.tasks[row]
+        self.endRemoveRows()
+
+    def patch_tasks(self, task_ids, matching):
+        # Применение изменений, сделанных в другом окне или процессе: matching — строки списка изменившихся задач,
+        # которые подходят под фильтр; остальные изменившиеся задачи убираются из таблицы
+        positions = {task[0]: row for row, task in enumerate(self.tasks)}
+        for task_id in task_ids:
+            self.descriptions.discard(task_id)
+        for task_id, task in matching.items():
+            row = positions.get(task_id)
+            if row is not None:
+                self.tasks[row] = task
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+        # Удаляемые строки убираются непрерывными диапазонами, начиная с конца списка
+        removed = sorted((positions[task_id] for task_id in task_ids
+                          if task_id in positions and task_id not in matching), reverse=True)
+        while removed:
+            last = first = removed.pop(0)
+            while removed and removed[0] == first - 1:
+                first = removed.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.tasks[first:last + 1]
+            self.endRemoveRows()
+        for task_id, task in matching.items():
+            if task_id not in positions:
+                self.insert_row(task)
+
+
+class DatabaseWorker(QThread):
+    progress_changed = pyqtSignal(int)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.cancel_requested = False
+        self.result = None
+        self.error = None
+
+    def cancel(self):
+        # Запрос отмены операции; проверяется рабочим потоком между пачками
+        self.cancel_requested = True
+
+    def is_cancelled(self):
+        return self.cancel_requested
+
+    def run(self):
+        # Рабочий поток получает собственное соединение от DatabaseManager и закрывает его по завершении
+        try:
+            self.result = self.work(self.db_manager)
+        except OperationCancelled:
+            self.cancelled.emit()
+        except (OSError, sqlite3.Error, ValueError, UnicodeDecodeError, csv.Error) as e:
+            self.error = str(e)
+            self.failed.emit(self.error)
+        else:
+            self.succeeded.emit(self.result)
+        finally:
+            self.db_manager.close()
+
+    def work(self, db_manager):
+        raise NotImplementedError
+
+
+class CsvImportWorker(DatabaseWorker):
+    def __init__(self, db_manager, file_path, user_id, parent=None):
+        super().__init__(db_manager, parent)
+        self.file_path = file_path
+        self.user_id = user_id
+
+    def work(self, db_manager):
+        return import_csv_file(db_manager, self.file_path, self.user_id,
+                               self.progress_changed.emit, self.is_cancelled)
+
+
+class CsvExportWorker(DatabaseWorker):
+    def __init__(self, db_manager, file_path, user_id, task_filter=None, parent=None):
+        super().__init__(db_manager, parent)
+        self.file_path = file_path
+        self.user_id = user_id
+        self.task_filter = task_filter
+
+    def work(self, db_manager):
+        return export_csv_file(db_manager, self.file_path, self.user_id, self.task_filter,
+                               self.progress_changed.emit, self.is_cancelled)
+
+
+class BackupWorker(DatabaseWorker):
+    def __init__(self, db_manager, file_path, parent=None):
+        super().__init__(db_manager, parent)
+        self.file_path = file_path
+
+    def work(self, db_manager):
+        return backup_database(db_manager, self.file_path, False, self.progress_changed.emit, self.is_cancelled)
+
+
+class RestoreWorker(DatabaseWorker):
+    def __init__(self, db_manager, file_path, username, parent=None):
+        super().__init__(db_manager, parent)
+        self.file_path = file_path
+        self.username = username
+
+    def work(self, db_manager):
+        restore_database(db_manager, self.file_path, self.username, self.progress_changed.emit, self.is_cancelled)
+        return db_manager.get_user_id(self.username)
+
+
+class HistoryCompactionWorker(DatabaseWorker):
+    def work(self, db_manager):
+        return db_manager.compact_history()
+
+
+class FilterQueryWorker(DatabaseWorker):
+    def __init__(self, db_manager, generation, user_id, task_filter, page_size, sort=None, parent=None):
+        super().__init__(db_manager, parent)
+        self.generation = generation
+        self.user_id = user_id
+        self.task_filter = task_filter
+        self.page_size = page_size
+        self.sort = sort
+        self.conn = None
+
+    def cancel(self):
+        # Прерывание выполняющегося запроса; interrupt() разрешено вызывать из другого потока
+        super().cancel()
+        conn = self.conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.ProgrammingError:
+                pass
+
+    def work(self, db_manager):
+        self.conn = db_manager.conn
+        try:
+            if self.is_cancelled():
+                raise OperationCancelled()
+            tasks, after = db_manager.fetch_tasks_page(
+                self.user_id, self.task_filter, None, self.page_size, self.sort
             )
-        ''')
-        self.conn.commit()
-
-    def add_user(self, username, password):
-        # Добавление нового пользователя
-        self.cur.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, password))
-        self.conn.commit()
-
-    def check_login(self, username, password):
-        # Проверка логина и пароля при входе
-        self.cur.execute('SELECT * FROM users WHERE username=? AND password=?', (username, password))
-        return self.cur.fetchone()
-
-    def add_task(self, user_id, title, description, deadline, priority):
-        # Добавление новой задачи
-        self.cur.execute('''
-            INSERT INTO tasks (user_id, title, description, deadline, priority)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, title, description, deadline, priority))
-        self.conn.commit()
-
-    def get_user_id(self, username):
-        # Получение ID пользователя по его имени
-        self.cur.execute('SELECT id FROM users WHERE username=?', (username,))
-        user_id = self.cur.fetchone()
-        return user_id[0] if user_id else None
-
-    def delete_task(self, title, description, user_id):
-        # Удаление задачи
-        self.cur.execute('DELETE FROM tasks WHERE title=? AND description=? AND user_id=?', (title, description, user_id))
-        self.conn.commit()
+        except sqlite3.OperationalError:
+            if self.is_cancelled():
+                raise OperationCancelled() from None
+            raise
+        finally:
+            self.conn = None
 
+        if self.is_cancelled():
+            raise OperationCancelled()
+        return self.generation, self.task_filter, tasks, after
 
-class LoginDialog(QDialog):
+
+class StartupWorker(DatabaseWorker):
     def __init__(self, db_manager, parent=None):
+        super().__init__(db_manager, parent)
+        self.phases = []
+
+    def work(self, db_manager):
+        # Подготовка базы, пока пользователь вводит логин
+        started = time.perf_counter()
+        db_manager.migrate()
+        self.phases.append(('открытие и миграции базы', time.perf_counter() - started))
+
+        started = time.perf_counter()
+        db_manager.warm_cache()
+        self.phases.append(('прогрев кэша', time.perf_counter() - started))
+
+
+class StartupPipeline:
+    def __init__(self, db_manager):
+        # Запуск фоновой подготовки базы и учет длительности этапов запуска
+        self.started = time.perf_counter()
+        self.phases = []
+        self.user_wait = 0.0
+        self.worker = StartupWorker(db_manager)
+        self.worker.start()
+
+    @property
+    def error(self):
+        return self.worker.error
+
+    def mark(self, name, started, user_wait=False):
+        # Запись длительности этапа; время ожидания ввода пользователя учитывается отдельно
+        duration = time.perf_counter() - started
+        self.phases.append((name, duration))
+        if user_wait:
+            self.user_wait += duration
+
+    def wait_ready(self):
+        # Ожидание завершения фоновой подготовки; возвращает False, если она завершилась ошибкой.
+        # Заставка показывается, только если подготовка еще идет; события обрабатываются во время ожидания,
+        # поэтому окна не замирают на время долгих миграций
+        if not self.worker.isFinished():
+            started = time.perf_counter()
+            loop = QEventLoop()
+            self.worker.finished.connect(loop.quit)
+            splash_screen = SplashScreen(QPixmap('splash_image.png'))
+            splash_screen.show()
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            if not self.worker.isFinished():
+                loop.exec_()
+            QApplication.restoreOverrideCursor()
+            splash_screen.close()
+            self.mark('ожидание подготовки базы', started)
+        return self.worker.error is None
+
+    def report(self):
+        # Вывод длительности этапов запуска в журнал
+        total = time.perf_counter() - self.started
+        phases = self.worker.phases + self.phases
+        logger.info(
+            'Запуск: %s; до готового окна %.0f мс, из них без учета ввода пользователя %.0f мс',
+            ', '.join(f'{name} {duration * 1000:.0f} мс' for name, duration in phases),
+            total * 1000, (total - self.user_wait) * 1000
+        )
+        return phases
+
+
+class LoginDialog(QDialog):
+    def __init__(self, db_manager, parent=None, startup=None):
         super().__init__(parent)
         self.setWindowTitle('Вход')
         self.db_manager = db_manager
+        self.startup = startup
         self.username_label = QLabel('Имя пользователя:')
         self.username_edit = QLineEdit(self)
 
@@ -116,8 +633,24 @@ class LoginDialog(QDialog):
         self.btn_login.clicked.connect(self.login)
         self.btn_register.clicked.connect(self.register)
 
+    def ensure_database_ready(self):
+        # База могла еще не закончить подготовку в фоне; при ошибке вход невозможен.
+        # На время ожидания диалог недоступен, чтобы повторное нажатие не начало вход еще раз
+        if self.startup is None:
+            return True
+        self.setEnabled(False)
+        ready = self.startup.wait_ready()
+        self.setEnabled(True)
+        if not ready:
+            QMessageBox.critical(self, 'Ошибка', f'Не удалось открыть базу данных: {self.startup.error}')
+            self.reject()
+            return False
+        return True
+
     def login(self):
         # Обработка нажатия кнопки "Войти"
+        if not self.ensure_database_ready():
+            return
         username = self.username_edit.text()
         password = self.password_edit.text()
         user_data = self.db_manager.check_login(username, password)
@@ -129,6 +662,8 @@ class LoginDialog(QDialog):
 
     def register(self):
         # Обработка нажатия кнопки "Зарегистрироваться"
+        if not self.ensure_database_ready():
+            return
         username = self.username_edit.text()
         password = self.password_edit.text()
 
@@ -141,7 +676,11 @@ class LoginDialog(QDialog):
             QMessageBox.warning(self, 'Ошибка', 'Пользователь с таким именем уже зарегистрирован.')
             return
 
-        self.db_manager.add_user(username, password)
+        try:
+            self.db_manager.add_user(username, password)
+        except sqlite3.Error as e:
+            warn_write_failed(self, self.db_manager, e)
+            return
         QMessageBox.information(self, 'Успешная регистрация', 'Пользователь зарегистрирован успешно.')
         self.accept()
 
@@ -165,7 +704,7 @@ class TaskDialog(QDialog):
 
         self.priority_label = QLabel('Приоритет:')
         self.priority_combobox = QComboBox(self)
-        self.priority_combobox.addItems(['Низкий', 'Средний', 'Высокий'])
+        self.priority_combobox.addItems(PRIORITIES)
 
         self.btn_add = QPushButton('Добавить', self)
         self.btn_cancel = QPushButton('Отмена', self)
@@ -181,44 +720,214 @@ class TaskDialog(QDialog):
         self.btn_cancel.clicked.connect(self.reject)
 
 
-class FilterDialog(QDialog):
+class BulkEditDialog(QDialog):
+    def __init__(self, count, parent=None):
+        # Изменение срока и приоритета сразу у нескольких задач; меняются только отмеченные поля
+        super().__init__(parent)
+        self.setWindowTitle(f'Изменение задач ({count})')
+        self.deadline_checkbox = QCheckBox('Срок исполнения:', self)
+        self.deadline_edit = QDateEdit(QDate.currentDate(), self)
+        self.deadline_edit.setCalendarPopup(True)
+        self.priority_checkbox = QCheckBox('Приоритет:', self)
+        self.priority_combobox = QComboBox(self)
+        self.priority_combobox.addItems(PRIORITIES)
+
+        self.btn_apply = QPushButton('Применить', self)
+        self.btn_cancel = QPushButton('Отмена', self)
+
+        layout = QFormLayout(self)
+        layout.addRow(self.deadline_checkbox, self.deadline_edit)
+        layout.addRow(self.priority_checkbox, self.priority_combobox)
+        layout.addRow(self.btn_apply, self.btn_cancel)
+
+        self.btn_apply.clicked.connect(self.accept)
+        self.btn_cancel.clicked.connect(self.reject)
+
+    def deadline(self):
+        return self.deadline_edit.date().toString(Qt.ISODate) if self.deadline_checkbox.isChecked() else None
+
+    def priority(self):
+        return self.priority_combobox.currentIndex() if self.priority_checkbox.isChecked() else None
+
+
+class DashboardPanel(QWidget):
+    # Данные меняются и со сменой даты, поэтому кроме обновления после изменений есть редкий таймер
+    REFRESH_INTERVAL_MS = 60 * 1000
+
+    def __init__(self, db_manager, parent=None):
+        # Сводка по задачам пользователя; читает счетчики, которые поддерживают триггеры базы
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.user_id = None
+        self.total_label = QLabel(self)
+        self.priority_labels = [QLabel(self) for _ in PRIORITIES]
+        self.overdue_label = QLabel(self)
+        self.week_label = QLabel(self)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.total_label)
+        for label in self.priority_labels:
+            layout.addWidget(label)
+        layout.addWidget(self.overdue_label)
+        layout.addWidget(self.week_label)
+        layout.addStretch(1)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def start(self, user_id):
+        self.user_id = user_id
+        self.refresh()
+        self.timer.start(self.REFRESH_INTERVAL_MS)
+
+    @profiled('обновление сводки')
+    def refresh(self):
+        counts = self.db_manager.dashboard_counts(self.user_id)
+        self.total_label.setText(f'Всего: {counts["total"]}')
+        for value, (label, name) in enumerate(zip(self.priority_labels, PRIORITIES)):
+            label.setText(f'{name}: {counts["priorities"].get(value, 0)}')
+        self.overdue_label.setText(f'Просрочено: {counts["overdue"]}')
+        self.week_label.setText(f'Срок на этой неделе: {counts["due_this_week"]}')
+
+
+class FilterBar(QWidget):
+    filter_changed = pyqtSignal()
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle('Фильтрация Задач')
         self.filter_text_edit = QLineEdit(self)
+        self.filter_text_edit.setPlaceholderText('Поиск по заголовку и описанию')
         self.filter_priority_combobox = QComboBox(self)
-        self.filter_priority_combobox.addItems(['', 'Низкий', 'Средний', 'Высокий'])
-
-        self.start_date_edit = QDateEdit(self)
-        self.end_date_edit = QDateEdit(self)
-
-        self.btn_filter = QPushButton('Применить фильтр', self)
+        self.filter_priority_combobox.addItems([''] + PRIORITIES)
+
+        self.date_range_checkbox = QCheckBox('Срок с', self)
+        self.start_date_edit = QDateEdit(QDate.currentDate(), self)
+        self.start_date_edit.setCalendarPopup(True)
+        self.end_date_edit = QDateEdit(QDate.currentDate().addMonths(1), self)
+        self.end_date_edit.setCalendarPopup(True)
+        self.set_date_range_enabled(False)
+
+        self.btn_reset = QPushButton('Сбросить', self)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(QLabel('Текст:', self))
+        layout.addWidget(self.filter_text_edit, 1)
+        layout.addWidget(QLabel('Приоритет:', self))
+        layout.addWidget(self.filter_priority_combobox)
+        layout.addWidget(self.date_range_checkbox)
+        layout.addWidget(self.start_date_edit)
+        layout.addWidget(QLabel('по', self))
+        layout.addWidget(self.end_date_edit)
+        layout.addWidget(self.btn_reset)
+
+        self.filter_text_edit.textChanged.connect(self.filter_changed)
+        self.filter_priority_combobox.currentIndexChanged.connect(self.filter_changed)
+        self.date_range_checkbox.toggled.connect(self.set_date_range_enabled)
+        self.date_range_checkbox.toggled.connect(self.filter_changed)
+        self.start_date_edit.dateChanged.connect(self.filter_changed)
+        self.end_date_edit.dateChanged.connect(self.filter_changed)
+        self.btn_reset.clicked.connect(self.reset)
+
+    def set_date_range_enabled(self, enabled):
+        self.start_date_edit.setEnabled(enabled)
+        self.end_date_edit.setEnabled(enabled)
+
+    def reset(self):
+        # Сброс всех условий фильтра
+        self.filter_text_edit.clear()
+        self.filter_priority_combobox.setCurrentIndex(0)
+        self.date_range_checkbox.setChecked(False)
+
+    def task_filter(self):
+        # Текущие параметры фильтра
+        if self.date_range_checkbox.isChecked():
+            start_date = self.start_date_edit.date().toString(Qt.ISODate)
+            end_date = self.end_date_edit.date().toString(Qt.ISODate)
+        else:
+            start_date = end_date = ''
+        # Первый пункт списка приоритетов пустой, остальные соответствуют номерам в PRIORITIES
+        priority_index = self.filter_priority_combobox.currentIndex()
+        return TaskFilter(
+            self.filter_text_edit.text().strip(),
+            priority_index - 1 if priority_index > 0 else None,
+            start_date,
+            end_date
+        )
 
-        layout = QFormLayout(self)
-        layout.addRow(QLabel('Текст:'), self.filter_text_edit)
-        layout.addRow(QLabel('Приоритет:'), self.filter_priority_combobox)
-        layout.addRow(QLabel('Срок с:'), self.start_date_edit)
-        layout.addRow(QLabel('Срок по:'), self.end_date_edit)
-        layout.addRow(self.btn_filter)
 
-        self.btn_filter.clicked.connect(self.accept)
+class DebugPanel(QDialog):
+    def __init__(self, profiler, parent=None):
+        # Скрытая панель профиля: задержки запросов, коммитов, обработчиков и простоев цикла событий
+        super().__init__(parent)
+        self.setWindowTitle('Профиль производительности')
+        self.profiler = profiler
+        self.text_edit = QPlainTextEdit(self)
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+
+        self.btn_refresh = QPushButton('Обновить', self)
+        self.btn_save = QPushButton('Сохранить JSON', self)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn_refresh)
+        buttons.addWidget(self.btn_save)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.text_edit)
+        layout.addLayout(buttons)
+
+        self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_save.clicked.connect(self.save)
+        self.resize(900, 600)
+        self.refresh()
+
+    def refresh(self):
+        snapshot = self.profiler.snapshot()
+        lines = [f'Порог медленной операции: {snapshot["slow_threshold_ms"]} мс', '']
+        for category, summary in snapshot['categories'].items():
+            lines.append(f'{category}: всего {summary["count"]}, p50 {summary["p50_ms"]} мс, '
+                         f'p95 {summary["p95_ms"]} мс, p99 {summary["p99_ms"]} мс, макс. {summary["max_ms"]} мс')
+            lines.append('    ' + ', '.join(f'{label}: {count}' for label, count in summary['buckets'].items() if count))
+        lines += ['', 'Самые затратные операции:']
+        for item in snapshot['operations'][:20]:
+            lines.append(f'{item["total_ms"]:>10.1f} мс  x{item["count"]:<6} строк {item["rows"]:<8} '
+                         f'[{item["category"]}] {item["name"]}')
+        lines += ['', 'Медленные операции:']
+        for item in reversed(snapshot['slow_operations']):
+            lines.append(f'{item["time"]}  {item["ms"]:>9.1f} мс  [{item["category"]}] {item["name"]}')
+        self.text_edit.setPlainText('\n'.join(lines))
+
+    def save(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Сохранить профиль', 'profile.json', 'JSON Files (*.json)')
+        if file_path:
+            try:
+                self.profiler.dump(file_path)
+            except OSError as e:
+                QMessageBox.warning(self, 'Ошибка', f'Не удалось сохранить профиль: {e}')
 
 
 class TaskManagerApp(QWidget):
-    def __init__(self, db_manager):
+    FILTER_DEBOUNCE_MS = 250
+    HISTORY_COMPACTION_INTERVAL_MS = 24 * 60 * 60 * 1000
+
+    def __init__(self, db_manager, startup=None):
         super().__init__()
         self.db_manager = db_manager
         self.current_user_id = None
-        login_dialog = LoginDialog(db_manager, self)
+        login_dialog = LoginDialog(db_manager, self, startup)
+        started = time.perf_counter()
         result = login_dialog.exec_()
+        if startup is not None:
+            startup.mark('вход пользователя', started, user_wait=True)
         if result == QDialog.Accepted:
             self.current_user_id = login_dialog.get_user_id()
-            splash_pixmap = QPixmap('splash_image.png')
-            splash_screen = SplashScreen(splash_pixmap)
-            splash_screen.show()
-            QApplication.processEvents()
+
+            started = time.perf_counter()
             self.init_ui()
-            splash_screen.finish(self)
+            if startup is not None:
+                startup.mark('построение окна и первая страница задач', started)
+                startup.report()
 
     def init_ui(self):
         # Инициализация пользовательского интерфейса
@@ -240,39 +949,97 @@ class TaskManagerApp(QWidget):
         vbox.addWidget(self.label_title)
         vbox.addSpacing(10)
 
-        self.table_tasks = QTableWidget(self)
-        self.table_tasks.setColumnCount(4)
-        self.table_tasks.setHorizontalHeaderLabels(['Заголовок', 'Описание', 'Срок', 'Приоритет'])
+        self.dashboard = DashboardPanel(self.db_manager, self)
+        vbox.addWidget(self.dashboard)
+
+        # Фильтр применяется по мере ввода: запрос выполняется после паузы в наборе, в фоновом потоке
+        self.filter_bar = FilterBar(self)
+        vbox.addWidget(self.filter_bar)
+        self.filter_generation = 0
+        self.filter_workers = set()
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(self.FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_bar.filter_changed.connect(self.filter_timer.start)
+
+        self.task_model = TaskTableModel(self.db_manager, self)
+        self.table_tasks = QTableView(self)
+        self.table_tasks.setModel(self.task_model)
+        self.table_tasks.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table_tasks.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.table_tasks.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Щелчок по заголовку столбца: по возрастанию, по убыванию, затем исходный порядок
+        header = self.table_tasks.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sectionClicked.connect(self.sort_tasks)
 
         self.btn_add_task = QPushButton('Добавить Задачу', self)
         self.btn_edit_task = QPushButton('Редактировать Задачу', self)
-        self.btn_delete_task = QPushButton('Удалить Задачу', self)
+        self.btn_bulk_edit = QPushButton('Изменить Выбранные', self)
+        self.btn_delete_task = QPushButton('Удалить Выбранные', self)
+        self.btn_delete_matching = QPushButton('Удалить Все по Фильтру', self)
         self.btn_export_csv = QPushButton('Экспорт в CSV', self)
         self.btn_import_csv = QPushButton('Импорт из CSV', self)
-        self.btn_filter_tasks = QPushButton('Фильтровать Задачи', self)
+        self.btn_backup = QPushButton('Резервная Копия Базы', self)
+        self.btn_restore = QPushButton('Восстановить из Копии', self)
 
         vbox.addWidget(self.table_tasks)
         vbox.addWidget(self.btn_add_task)
         vbox.addWidget(self.btn_edit_task)
+        vbox.addWidget(self.btn_bulk_edit)
         vbox.addWidget(self.btn_delete_task)
+        vbox.addWidget(self.btn_delete_matching)
         vbox.addWidget(self.btn_export_csv)
         vbox.addWidget(self.btn_import_csv)
-        vbox.addWidget(self.btn_filter_tasks)
+        vbox.addWidget(self.btn_backup)
+        vbox.addWidget(self.btn_restore)
 
         self.btn_add_task.clicked.connect(self.show_add_task_dialog)
         self.btn_edit_task.clicked.connect(self.edit_task)
+        self.btn_bulk_edit.clicked.connect(self.bulk_edit_tasks)
         self.btn_delete_task.clicked.connect(self.delete_task)
+        self.btn_delete_matching.clicked.connect(self.delete_matching_tasks)
         self.btn_export_csv.clicked.connect(self.export_csv)
         self.btn_import_csv.clicked.connect(self.import_csv)
-        self.btn_filter_tasks.clicked.connect(self.show_filter_dialog)
-
-        self.conn = sqlite3.connect('tasks.db')
-        self.cur = self.conn.cursor()
-        self.create_table()
+        self.btn_backup.clicked.connect(self.backup_database)
+        self.btn_restore.clicked.connect(self.restore_database)
 
         self.load_tasks()
 
+        # Напоминания о сроках: в системном трее, если он доступен, иначе окном приложения
+        self.tray_icon = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray_icon = QSystemTrayIcon(self.style().standardIcon(QStyle.SP_MessageBoxInformation), self)
+            self.tray_icon.setToolTip('Менеджер Задач')
+            self.tray_icon.show()
+        self.reminder_scheduler = ReminderScheduler(self.db_manager, self)
+        self.reminder_scheduler.reminders_due.connect(self.show_reminders)
+        self.reminder_scheduler.start(self.current_user_id)
+        self.dashboard.start(self.current_user_id)
+
+        # Изменения из других экземпляров приложения с той же базой применяются к открытому списку
+        self.change_watcher = ChangeWatcher(self.db_manager, self)
+        self.change_watcher.tasks_changed.connect(self.refresh_tasks)
+        self.change_watcher.reload_required.connect(self.reload_tasks_and_reminders)
+        self.change_watcher.start(self.current_user_id)
+
+        # Журнал изменений сжимается по сроку хранения в фоне: сразу после входа и затем раз в сутки
+        self.history_compaction_worker = None
+        self.history_timer = QTimer(self)
+        self.history_timer.timeout.connect(self.compact_history)
+        self.history_timer.start(self.HISTORY_COMPACTION_INTERVAL_MS)
+        QApplication.instance().aboutToQuit.connect(self.wait_history_compaction)
+        self.compact_history()
+
+        # Скрытая панель профиля открывается сочетанием Ctrl+Shift+D
+        if self.db_manager.profiler is not None:
+            self.stall_monitor = StallMonitor(self.db_manager.profiler, self)
+            self.debug_shortcut = QShortcut(QKeySequence('Ctrl+Shift+D'), self)
+            self.debug_shortcut.activated.connect(self.show_debug_panel)
+
         self.setStyleSheet('''
                     QWidget {
                         background-color: #fff;  /* Светлая тема по умолчанию */
@@ -283,7 +1050,7 @@ class TaskManagerApp(QWidget):
                         color: #000;
                     }
 
-                    QTableWidget {
+                    QTableView {
                         background-color: #eee;
                         color: #000;
                         border: 1px solid #ccc;
@@ -294,30 +1061,12 @@ class TaskManagerApp(QWidget):
         self.setWindowTitle('Менеджер Задач')
         self.show()
 
-    def create_table(self):
-        # Создание таблицы задач, если она не существует
-        self.cur.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                title TEXT,
-                description TEXT,
-                deadline DATE,
-                priority TEXT
-            )
-        ''')
-        self.conn.commit()
-
+    @profiled('загрузка задач')
     def load_tasks(self):
-        # Загрузка задач из базы данных для текущего пользователя
+        # Загрузка задач из базы данных для текущего пользователя с учетом фильтра
         if self.current_user_id is not None:
-            self.cur.execute('SELECT id, title, description, deadline, priority FROM tasks WHERE user_id=?', (self.current_user_id,))
-            tasks = self.cur.fetchall()
-            self.table_tasks.setRowCount(0)
-            for row_num, task in enumerate(tasks):
-                self.table_tasks.insertRow(row_num)
-                for col_num, data in enumerate(task[1:]):
-                    self.table_tasks.setItem(row_num, col_num, QTableWidgetItem(str(data)))
+            self.cancel_filter_queries()
+            self.task_model.load(self.current_user_id, self.filter_bar.task_filter())
 
     def show_add_task_dialog(self):
         # Отображение диалога добавления задачи
@@ -328,38 +1077,42 @@ class TaskManagerApp(QWidget):
             title = dialog.title_edit.text()
             description = dialog.description_edit.toPlainText()
             deadline = dialog.deadline_edit.date().toString(Qt.ISODate)
-            priority = dialog.priority_combobox.currentText()
+            priority = dialog.priority_combobox.currentIndex()
 
             if not title:
                 QMessageBox.warning(self, 'Ошибка', 'Введите обязательный заголовок.')
                 return
 
-            self.add_task_to_database(title, description, deadline, priority)
-            self.load_tasks()
+            task_id = self.add_task_to_database(title, description, deadline, priority)
+            if task_id is not None:
+                self.reminder_scheduler.task_added(task_id, title, deadline)
+                self.dashboard.refresh()
+            if task_id is not None and self.db_manager.task_matches(
+                    task_id, self.current_user_id, self.task_model.task_filter):
+                self.task_model.append_task((task_id, title, description, deadline, priority))
 
+    @profiled('добавление задачи')
     def add_task_to_database(self, title, description, deadline, priority):
         # Добавление задачи в базу данных
+        # Возвращает id новой задачи или None, если задача не добавлена
         if self.current_user_id is not None:
-            self.cur.execute('''
-                INSERT INTO tasks (user_id, title, description, deadline, priority)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (self.current_user_id, title, description, deadline, priority))
-            self.conn.commit()
+            try:
+                return self.db_manager.add_task(self.current_user_id, title, description, deadline, priority)
+            except sqlite3.Error as e:
+                warn_write_failed(self, self.db_manager, e)
 
     def edit_task(self):
         # Редактирование выбранной задачи
-        selected_row = self.table_tasks.currentRow()
+        selected_row = self.table_tasks.currentIndex().row()
         if selected_row != -1:
-            title = self.table_tasks.item(selected_row, 0).text()
-            description = self.table_tasks.item(selected_row, 1).text()
-            deadline = self.table_tasks.item(selected_row, 2).text()
-            priority = self.table_tasks.item(selected_row, 3).text()
+            task_id, title, _, deadline, priority = self.task_model.task_at(selected_row)
+            description = self.task_model.full_description(selected_row)
 
             dialog = TaskDialog(self)
             dialog.title_edit.setText(title)
             dialog.description_edit.setPlainText(description)
             dialog.deadline_edit.setDate(QDate.fromString(deadline, Qt.ISODate))
-            dialog.priority_combobox.setCurrentText(priority)
+            dialog.priority_combobox.setCurrentIndex(priority)
 
             result = dialog.exec_()
 
@@ -367,123 +1120,325 @@ class TaskManagerApp(QWidget):
                 new_title = dialog.title_edit.text()
                 new_description = dialog.description_edit.toPlainText()
                 new_deadline = dialog.deadline_edit.date().toString(Qt.ISODate)
-                new_priority = dialog.priority_combobox.currentText()
-
-                self.edit_task_in_database(title, description, new_title, new_description, new_deadline, new_priority)
-                self.load_tasks()
-
-    def edit_task_in_database(self, title, description, new_title, new_description, new_deadline, new_priority):
-        # Редактирование задачи в базе данных
-        if self.current_user_id is not None:
-            self.cur.execute('''
-                        UPDATE tasks
-                        SET title=?, description=?, deadline=?, priority=?
-                        WHERE title=? AND description=? AND user_id=?
-                    ''', (
-            new_title, new_description, new_deadline, new_priority, title, description, self.current_user_id))
-            self.conn.commit()
+                new_priority = dialog.priority_combobox.currentIndex()
+
+                if not self.edit_task_in_database(task_id, new_title, new_description, new_deadline, new_priority):
+                    return
+                self.reminder_scheduler.task_changed(task_id, new_title, new_deadline)
+                self.dashboard.refresh()
+                # Пока диалог был открыт, строки могли сместиться из-за изменений из другого окна
+                row = self.task_model.row_of(task_id)
+                if row == -1:
+                    return
+                # Обновление только измененной строки; если задача перестала подходить под фильтр, строка убирается
+                if self.db_manager.task_matches(task_id, self.current_user_id, self.task_model.task_filter):
+                    self.task_model.update_task_row(
+                        row, (task_id, new_title, new_description, new_deadline, new_priority)
+                    )
+                else:
+                    self.task_model.remove_task_row(row)
+
+    @profiled('изменение задачи')
+    def edit_task_in_database(self, task_id, new_title, new_description, new_deadline, new_priority):
+        # Редактирование задачи в базе данных; возвращает False, если изменения не сохранены
+        if self.current_user_id is None:
+            return False
+        try:
+            self.db_manager.update_task(task_id, self.current_user_id,
+                                        new_title, new_description, new_deadline, new_priority)
+        except sqlite3.Error as e:
+            warn_write_failed(self, self.db_manager, e)
+            return False
+        return True
+
+    def selected_task_ids(self):
+        # id задач в выделенных строках, в порядке строк
+        rows = sorted(index.row() for index in self.table_tasks.selectionModel().selectedRows())
+        return [self.task_model.task_at(row)[0] for row in rows]
 
     def delete_task(self):
-        # Удаление выбранной задачи
-        selected_row = self.table_tasks.currentRow()
-        if selected_row != -1:
-            title = self.table_tasks.item(selected_row, 0).text()
-            description = self.table_tasks.item(selected_row, 1).text()
-            reply = QMessageBox.question(self, 'Удаление задачи', f'Вы уверены, что хотите удалить задачу "{title}"?',
-                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-
-            if reply == QMessageBox.Yes:
-                self.delete_task_from_database(title, description)
-                self.load_tasks()
-
-    def delete_task_from_database(self, title, description):
-        # Удаление задачи из базы данных
-        if self.current_user_id is not None:
-            self.db_manager.delete_task(title, description, self.current_user_id)
+        # Удаление выделенных задач одним запросом после одного подтверждения
+        task_ids = self.selected_task_ids()
+        if not task_ids:
+            return
+        if len(task_ids) == 1:
+            title = self.task_model.task_at(self.task_model.row_of(task_ids[0]))[1]
+            question = f'Вы уверены, что хотите удалить задачу "{title}"?'
+        else:
+            question = f'Вы уверены, что хотите удалить выбранные задачи ({len(task_ids)})?'
+        reply = QMessageBox.question(self, 'Удаление задачи', question,
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+        if reply == QMessageBox.Yes and self.delete_tasks_from_database(task_ids):
+            self.refresh_tasks(task_ids)
+
+    @profiled('удаление задач')
+    def delete_tasks_from_database(self, task_ids):
+        # Удаление задач из базы данных; возвращает False, если задачи не удалены
+        if self.current_user_id is None:
+            return False
+        try:
+            self.db_manager.delete_tasks(self.current_user_id, task_ids)
+        except sqlite3.Error as e:
+            warn_write_failed(self, self.db_manager, e)
+            return False
+        return True
+
+    def bulk_edit_tasks(self):
+        # Изменение срока и/или приоритета всех выделенных задач одним запросом
+        task_ids = self.selected_task_ids()
+        if not task_ids:
+            return
+        dialog = BulkEditDialog(len(task_ids), self)
+        if dialog.exec_() == QDialog.Accepted and (dialog.deadline() is not None or dialog.priority() is not None):
+            if self.update_tasks_in_database(task_ids, dialog.deadline(), dialog.priority()):
+                self.refresh_tasks(task_ids)
+
+    @profiled('изменение задач')
+    def update_tasks_in_database(self, task_ids, deadline, priority):
+        if self.current_user_id is None:
+            return False
+        try:
+            self.db_manager.update_tasks(self.current_user_id, task_ids, deadline, priority)
+        except sqlite3.Error as e:
+            warn_write_failed(self, self.db_manager, e)
+            return False
+        return True
+
+    def delete_matching_tasks(self):
+        # Удаление всех задач, подходящих под фильтр показанной выборки, включая еще не загруженные страницы.
+        # Текст в панели фильтра может быть еще не применен (задержка ввода или выполняющийся запрос)
+        if self.current_user_id is None:
+            return
+        task_filter = self.task_model.task_filter
+        count = self.db_manager.count_tasks(self.current_user_id, task_filter)
+        if count == 0:
+            QMessageBox.information(self, 'Удаление задач', 'Нет задач, подходящих под фильтр.')
+            return
+        reply = QMessageBox.question(self, 'Удаление задач',
+                                     f'Удалить все задачи, подходящие под фильтр ({count})?',
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes and self.delete_matching_tasks_in_database(task_filter):
+            self.reload_tasks_and_reminders()
+
+    @profiled('удаление задач по фильтру')
+    def delete_matching_tasks_in_database(self, task_filter):
+        try:
+            self.db_manager.delete_matching_tasks(self.current_user_id, task_filter)
+        except sqlite3.Error as e:
+            warn_write_failed(self, self.db_manager, e)
+            return False
+        return True
+
+    def run_worker(self, worker, title, label, on_succeeded):
+        # Запуск фоновой операции с диалогом прогресса и возможностью отмены
+        progress = QProgressDialog(label, 'Отмена', 0, 100, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setMinimumDuration(0)
+
+        worker.progress_changed.connect(progress.setValue)
+        for signal in (worker.succeeded, worker.failed, worker.cancelled):
+            signal.connect(progress.close)
+        worker.succeeded.connect(on_succeeded)
+        worker.failed.connect(lambda error: QMessageBox.warning(self, 'Ошибка', f'{title}: {error}'))
+        worker.cancelled.connect(lambda: QMessageBox.information(self, title, 'Операция отменена.'))
+        progress.canceled.connect(worker.cancel)
+
+        self.active_worker = worker
+        worker.start()
 
     def export_csv(self):
-        # Экспорт данных в CSV файл
+        # Экспорт задач текущей выборки в CSV файл в фоновом потоке
         file_path, _ = QFileDialog.getSaveFileName(self, 'Экспорт в CSV', '', 'CSV Files (*.csv);;All Files(*.*)')
 
-        if file_path:
-            with open(file_path, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Заголовок', 'Описание', 'Срок исполнения', 'Приоритет'])
-
-                for row in range(self.table_tasks.rowCount()):
-                    row_data = []
-                    for col in range(self.table_tasks.columnCount()):
-                        item = self.table_tasks.item(row, col)
-                        if item is not None:
-                            row_data.append(item.text())
-                        else:
-                            row_data.append('')
-                    writer.writerow(row_data)
+        if file_path and self.current_user_id is not None:
+            worker = CsvExportWorker(self.db_manager, file_path, self.current_user_id,
+                                     self.task_model.task_filter, self)
+            self.run_worker(worker, 'Экспорт в CSV', 'Экспорт задач...', self.on_export_succeeded)
+
+    def on_export_succeeded(self, exported):
+        QMessageBox.information(self, 'Экспорт в CSV', f'Экспортировано задач: {exported}.')
 
     def import_csv(self):
-        # Импорт данных из CSV файла
+        # Импорт данных из CSV файла в фоновом потоке
         file_path, _ = QFileDialog.getOpenFileName(self, 'Импорт из CSV', '', 'CSV Files (*.csv);;All Files (*.*)')
 
-        if file_path:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                header = next(reader)
-                if header == ['Заголовок', 'Описание', 'Срок исполнения', 'Приоритет']:
-                    self.clear_table()
-                    for row_data in reader:
-                        self.add_task_from_csv(row_data)
-                    self.load_tasks()
-                else:
-                    QMessageBox.warning(self, 'Ошибка', 'Выбранный файл не является файлом CSV с задачами.')
+        if file_path and self.current_user_id is not None:
+            worker = CsvImportWorker(self.db_manager, file_path, self.current_user_id, self)
+            self.run_worker(worker, 'Импорт из CSV', 'Импорт задач...', self.on_import_succeeded)
+
+    def on_import_succeeded(self, result):
+        # Завершение импорта: обновление таблицы (если задачи изменились) и отчет о пропущенных строках
+        inserted, updated, skipped, errors = result
+        if inserted or updated:
+            self.reload_tasks_and_reminders()
+
+        message = f'Добавлено задач: {inserted}.\nОбновлен приоритет: {updated}.\nУже существовало: {skipped}.'
+        if errors:
+            details = '\n'.join(f'Строка {line_num}: {error}' for line_num, error in errors[:10])
+            message += f'\nПропущено некорректных строк: {len(errors)}.\n{details}'
+        QMessageBox.information(self, 'Импорт из CSV', message)
+
+    def backup_database(self):
+        # Снимок всей базы в фоновом потоке; работа с задачами во время копирования не блокируется
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, 'Резервная копия', 'tasks-backup.db',
+            'Снимок базы (*.db);;Сжатый снимок (*.db.gz);;All Files (*.*)'
+        )
 
-    def clear_table(self):
-        # Очистка таблицы задач
-        self.table_tasks.setRowCount(0)
+        if file_path:
+            if selected_filter.startswith('Сжатый') and not file_path.endswith('.gz'):
+                file_path += '.gz'
+            worker = BackupWorker(self.db_manager, file_path, self)
+            self.run_worker(worker, 'Резервная копия', 'Копирование базы...', self.on_backup_succeeded)
+
+    def on_backup_succeeded(self, size):
+        QMessageBox.information(self, 'Резервная копия', f'Снимок базы сохранен ({size / 2 ** 20:.1f} МБ).')
+
+    def restore_database(self):
+        # Замена всей базы снимком (для всех пользователей) после подтверждения
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, 'Восстановление из копии', '', 'Снимки базы (*.db *.db.gz);;All Files (*.*)'
+        )
 
-    def add_task_from_csv(self, row_data):
-        # Добавление задачи из CSV файла в базу данных
-        if self.current_user_id is not None:
-            title, description, deadline, priority = row_data
-            self.db_manager.add_task(self.current_user_id, title, description, deadline, priority)
+        if file_path and self.current_user_id is not None:
+            reply = QMessageBox.question(
+                self, 'Восстановление из копии',
+                'Все задачи всех пользователей будут заменены данными снимка. Продолжить?',
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                username = self.db_manager.get_username(self.current_user_id)
+                worker = RestoreWorker(self.db_manager, file_path, username, self)
+                self.run_worker(worker, 'Восстановление из копии', 'Восстановление базы...',
+                                self.on_restore_succeeded)
+
+    def on_restore_succeeded(self, user_id):
+        # id пользователя в снимке может отличаться от текущего
+        self.current_user_id = user_id
+        self.dashboard.start(self.current_user_id)
+        self.change_watcher.start(self.current_user_id)
+        self.reload_tasks_and_reminders()
+        QMessageBox.information(self, 'Восстановление из копии', 'База восстановлена из снимка.')
+
+    @profiled('сортировка')
+    def sort_tasks(self, column):
+        # Порядок меняется запросом к базе; заголовок показывает текущую сортировку модели
+        sort = self.task_model.sort
+        if self.task_model.is_sortable(column):
+            if sort is None or sort[0] != TaskTableModel.SORT_COLUMNS[column]:
+                self.task_model.set_sort(column, False)
+            elif not sort[1]:
+                self.task_model.set_sort(column, True)
+            else:
+                self.task_model.set_sort(None, False)
+            self.load_tasks()
 
-    def show_filter_dialog(self):
-        # Отображение диалога фильтрации задач
-        dialog = FilterDialog(self)
-        result = dialog.exec_()
+        header = self.table_tasks.horizontalHeader()
+        sort = self.task_model.sort
+        if sort is None:
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+        else:
+            header.setSortIndicator(TaskTableModel.SORT_COLUMNS.index(sort[0]),
+                                    Qt.DescendingOrder if sort[1] else Qt.AscendingOrder)
+
+    @profiled('обновление изменившихся задач')
+    def refresh_tasks(self, task_ids):
+        # Перечитываются только изменившиеся задачи (здесь или в другом окне):
+        # строки таблицы и напоминания обновляются на месте
+        existing = {task[0]: task for task in self.db_manager.fetch_tasks_by_ids(self.current_user_id, task_ids)}
+        matching = {
+            task[0]: task
+            for task in self.db_manager.fetch_tasks_by_ids(self.current_user_id, task_ids, self.task_model.task_filter)
+        }
+        self.task_model.patch_tasks(task_ids, matching)
+        for task_id in task_ids:
+            task = existing.get(task_id)
+            if task is None:
+                self.reminder_scheduler.task_removed(task_id)
+            else:
+                self.reminder_scheduler.task_changed(task_id, task[1], task[3])
+        self.dashboard.refresh()
+
+    def reload_tasks_and_reminders(self):
+        # Полная перезагрузка (импорт, восстановление из снимка): сохраненные описания могли устареть
+        self.task_model.descriptions.clear()
+        self.load_tasks()
+        self.reminder_scheduler.start(self.current_user_id)
+        self.dashboard.refresh()
 
-        if result == QDialog.Accepted:
-            filter_text = dialog.filter_text_edit.text()
-            filter_priority = dialog.filter_priority_combobox.currentText()
-            start_date = dialog.start_date_edit.date().toString(Qt.ISODate)
-            end_date = dialog.end_date_edit.date().toString(Qt.ISODate)
+    def apply_filter(self):
+        # Применение фильтра после паузы в вводе
+        self.filter_tasks(self.filter_bar.task_filter())
 
-            self.filter_tasks(filter_text, filter_priority, start_date, end_date)
+    def cancel_filter_queries(self):
+        # Прерывание незавершенных запросов фильтрации; их результаты будут отброшены
+        self.filter_generation += 1
+        for worker in self.filter_workers:
+            worker.cancel()
 
-    def filter_tasks(self, text, priority, start_date, end_date):
-        # Фильтрация задач по заданным параметрам
+    def filter_tasks(self, task_filter):
+        # Фильтрация задач в фоновом потоке; отображается только результат последнего запроса
         if self.current_user_id is not None:
-            query = 'SELECT id, title, description, deadline, priority FROM tasks WHERE user_id=?'
-            params = (self.current_user_id,)
-
-            if text:
-                query += ' AND (title LIKE ? OR description LIKE ?)'
-                params += (f'%{text}%', f'%{text}%')
-
-            if priority:
-                query += ' AND priority=?'
-                params += (priority,)
-
-            if start_date and end_date:
-                query += ' AND deadline BETWEEN ? AND ?'
-                params += (start_date, end_date)
+            self.cancel_filter_queries()
+            worker = FilterQueryWorker(self.db_manager, self.filter_generation, self.current_user_id,
+                                       task_filter, TaskTableModel.PAGE_SIZE, self.task_model.sort, self)
+            worker.succeeded.connect(self.on_filter_succeeded)
+            worker.failed.connect(lambda error: QMessageBox.warning(self, 'Ошибка', f'Ошибка фильтрации: {error}'))
+            worker.finished.connect(lambda: self.filter_workers.discard(worker))
+            worker.finished.connect(worker.deleteLater)
+            self.filter_workers.add(worker)
+            worker.start()
+
+    @profiled('применение фильтра')
+    def on_filter_succeeded(self, result):
+        generation, task_filter, tasks, after = result
+        if generation == self.filter_generation:
+            exhausted = len(tasks) < TaskTableModel.PAGE_SIZE
+            self.task_model.show_page(self.current_user_id, task_filter, tasks, after, exhausted)
+
+    def compact_history(self):
+        # Сжатие журнала старше HISTORY_RETENTION_DAYS в рабочем потоке; ошибка (например, база заблокирована
+        # другим экземпляром) только записывается в журнал, следующая попытка будет через сутки
+        if self.history_compaction_worker is not None:
+            return
+        worker = HistoryCompactionWorker(self.db_manager, self)
+        worker.succeeded.connect(
+            lambda removed: logger.info('Сжатие журнала изменений: удалено записей %d', removed) if removed else None
+        )
+        worker.failed.connect(lambda error: logger.warning('Не удалось сжать журнал изменений: %s', error))
+        worker.finished.connect(self.on_history_compaction_finished)
+        self.history_compaction_worker = worker
+        worker.start()
+
+    def on_history_compaction_finished(self):
+        self.history_compaction_worker.deleteLater()
+        self.history_compaction_worker = None
+
+    def wait_history_compaction(self):
+        # Поток нельзя уничтожать во время работы: при выходе сжатие дожидается завершения
+        if self.history_compaction_worker is not None:
+            self.history_compaction_worker.wait()
+
+    def show_reminders(self, due):
+        # Одно уведомление на все задачи, срок которых наступил одновременно
+        titles = [title for _, title, _ in due[:5]]
+        message = 'Срок сегодня: ' + ', '.join(f'"{title}"' for title in titles)
+        if len(due) > len(titles):
+            message += f' и еще {len(due) - len(titles)}'
+        if self.tray_icon is not None:
+            self.tray_icon.showMessage('Напоминание о сроке', message, QSystemTrayIcon.Information)
+        else:
+            box = QMessageBox(QMessageBox.Information, 'Напоминание о сроке', message, QMessageBox.Ok, self)
+            box.setAttribute(Qt.WA_DeleteOnClose)
+            box.setWindowModality(Qt.NonModal)
+            box.show()
 
-            self.cur.execute(query, params)
-            tasks = self.cur.fetchall()
-            self.table_tasks.setRowCount(0)
-            for row_num, task in enumerate(tasks):
-                self.table_tasks.insertRow(row_num)
-                for col_num, data in enumerate(task[1:]):
-                    self.table_tasks.setItem(row_num, col_num, QTableWidgetItem(str(data)))
+    def show_debug_panel(self):
+        DebugPanel(self.db_manager.profiler, self).exec_()
 
     def toggle_theme(self, action):
         # Переключение темы приложения
@@ -498,7 +1453,7 @@ class TaskManagerApp(QWidget):
                             color: #000;
                         }
 
-                        QTableWidget {
+                        QTableView {
                             background-color: #eee;
                             color: #000;
                             border: 1px solid #ccc;
@@ -516,7 +1471,7 @@ class TaskManagerApp(QWidget):
                             color: #fff;
                         }
 
-                        QTableWidget {
+                        QTableView {
                             background-color: #444;
                             color: #fff;
                             border: 1px solid #555;
@@ -525,8 +1480,18 @@ class TaskManagerApp(QWidget):
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
-    db_manager = DatabaseManager()
-    task_manager_app = TaskManagerApp(db_manager)
+    profiler = Profiler()
+    # TASKMANAGER_PROFILE задает файл, в который профиль сохраняется при выходе
+    profile_path = os.environ.get('TASKMANAGER_PROFILE')
+    if profile_path:
+        app.aboutToQuit.connect(lambda: profiler.dump(profile_path))
+    db_manager = DatabaseManager(migrate=False, profiler=profiler)
+    startup = StartupPipeline(db_manager)
+    task_manager_app = TaskManagerApp(db_manager, startup)
+    if task_manager_app.current_user_id is None:
+        startup.worker.wait()
+        sys.exit(0)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,8 @@
+from .store import (
+    PRIORITIES, CSV_HEADER, MIGRATIONS, DESCRIPTION_PREVIEW_CHARS, OperationCancelled, TaskFilter,
+    DatabaseManager, fts5_available, fold_history, parse_task_row, priority_value
+)
+from .csv_io import import_csv_file, export_csv_file, write_csv
+from .backup import backup_database, restore_database
+from .profiling import Profiler
+from .reminders import ReminderQueue
@@ -0,0 +1,155 @@
+import os
+import gzip
+import zlib
+import sqlite3
+from urllib.request import pathname2url
+
+from .store import MIGRATIONS, OperationCancelled
+
+
+BACKUP_STEP_PAGES = 1024
+COPY_CHUNK_SIZE = 1 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def stage_progress(progress, start, end):
+    # Пересчет процента одного этапа операции в общий процент (например, копирование 0-50, сжатие 50-100)
+    if progress is None:
+        return None
+    return lambda percent: progress(start + percent * (end - start) // 100)
+
+
+def backup_step_handler(progress, is_cancelled):
+    # Обработчик шагов Connection.backup: процент скопированных страниц и проверка отмены.
+    # Исключение из обработчика прерывает копирование
+    def handler(status, remaining, total):
+        if is_cancelled is not None and is_cancelled():
+            raise OperationCancelled()
+        if progress is not None and total:
+            progress((total - remaining) * 100 // total)
+    return handler
+
+
+def copy_file(source, target, report=None, is_cancelled=None):
+    # Потоковое копирование между файловыми объектами (сжатие и распаковка снимка);
+    # report вызывается после каждого блока и сообщает прогресс по исходному файлу на диске
+    while True:
+        if is_cancelled is not None and is_cancelled():
+            raise OperationCancelled()
+        chunk = source.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(chunk)
+        if report is not None:
+            report()
+
+
+def file_progress(progress, file, size):
+    # Процент прочитанных байтов исходного файла
+    if progress is None:
+        return None
+    return lambda: progress(min(file.tell() * 100 // (size or 1), 100))
+
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def is_compressed(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def backup_database(db_manager, file_path, vacuum=False, progress=None, is_cancelled=None):
+    # Снимок базы без остановки приложения. Страницы копируются шагами по BACKUP_STEP_PAGES внутри одной
+    # читающей транзакции: в режиме WAL она не мешает писателям, а снимок остается согласованным и не
+    # начинается заново после каждой записи другого соединения. vacuum=True создает снимок через VACUUM INTO:
+    # без свободных страниц (место после массовых удалений), но без промежуточного прогресса.
+    # Файл с расширением .gz сжимается gzip. Возвращает размер снимка в байтах
+    compress = file_path.endswith('.gz')
+    part_path = file_path + '.part'
+    snapshot_path = part_path + '.db' if compress else part_path
+    copy_progress = stage_progress(progress, 0, 50) if compress else progress
+    try:
+        remove_files(part_path, snapshot_path)
+        if vacuum:
+            db_manager.conn.execute('VACUUM INTO ?', (snapshot_path,))
+        else:
+            target = sqlite3.connect(snapshot_path)
+            try:
+                db_manager.conn.execute('BEGIN')
+                try:
+                    db_manager.conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+                    db_manager.conn.backup(target, pages=BACKUP_STEP_PAGES,
+                                           progress=backup_step_handler(copy_progress, is_cancelled))
+                finally:
+                    db_manager.conn.rollback()
+            finally:
+                target.close()
+
+        # Снимок — самостоятельный файл без журнала WAL рядом
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            snapshot.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            snapshot.close()
+
+        if compress:
+            with open(snapshot_path, 'rb') as source, gzip.open(part_path, 'wb', compresslevel=6) as target:
+                report = file_progress(stage_progress(progress, 50, 100), source, os.path.getsize(snapshot_path))
+                copy_file(source, target, report, is_cancelled)
+            os.remove(snapshot_path)
+        os.replace(part_path, file_path)
+    except BaseException:
+        remove_files(part_path, snapshot_path)
+        raise
+
+    return os.path.getsize(file_path)
+
+
+def check_snapshot(conn, username=None):
+    # Проверка снимка перед восстановлением: целостность, наличие таблиц задач, версия схемы не новее
+    # известной приложению и (для интерфейса) наличие текущего пользователя
+    if conn.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+        raise ValueError('файл снимка поврежден')
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    if not {'users', 'tasks'} <= tables:
+        raise ValueError('файл не является снимком базы задач')
+    if conn.execute('PRAGMA user_version').fetchone()[0] > len(MIGRATIONS):
+        raise ValueError('снимок создан более новой версией приложения')
+    if username is not None and conn.execute('SELECT 1 FROM users WHERE username=?', (username,)).fetchone() is None:
+        raise ValueError(f'в снимке нет пользователя "{username}"')
+
+
+def restore_database(db_manager, file_path, username=None, progress=None, is_cancelled=None):
+    # Замена содержимого базы снимком (обычным или сжатым). Страницы записываются в базу одной транзакцией
+    # записи: при ошибке или отмене база остается прежней, а другие экземпляры приложения видят либо старые,
+    # либо новые данные. После восстановления схема снимка доводится миграциями до текущей версии
+    compressed = is_compressed(file_path)
+    snapshot_path = db_manager.path + '.restore' if compressed else file_path
+    copy_progress = stage_progress(progress, 50, 100) if compressed else progress
+    try:
+        if compressed:
+            with open(file_path, 'rb') as raw_file, open(snapshot_path, 'wb') as target:
+                report = file_progress(stage_progress(progress, 0, 50), raw_file, os.path.getsize(file_path))
+                try:
+                    copy_file(gzip.GzipFile(fileobj=raw_file), target, report, is_cancelled)
+                except (EOFError, zlib.error, gzip.BadGzipFile):
+                    # Обрезанный или испорченный архив сообщается так же, как поврежденный снимок
+                    raise ValueError('файл снимка поврежден') from None
+
+        # Снимок открывается только для чтения: несуществующий файл не создается
+        source = sqlite3.connect(f'file:{pathname2url(os.path.abspath(snapshot_path))}?mode=ro', uri=True)
+        try:
+            check_snapshot(source, username)
+            source.backup(db_manager.conn, pages=BACKUP_STEP_PAGES,
+                          progress=backup_step_handler(copy_progress, is_cancelled))
+        finally:
+            source.close()
+    finally:
+        if compressed:
+            remove_files(snapshot_path)
+
+    db_manager.migrate()
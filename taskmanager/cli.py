@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import argparse
+import sqlite3
+import datetime
+
+from .store import PRIORITIES, TaskFilter, DatabaseManager, priority_value
+from .csv_io import import_csv_file, export_csv_file, write_csv
+from .backup import backup_database, restore_database
+from .profiling import Profiler
+
+
+class CliError(Exception):
+    pass
+
+
+def iso_date(value):
+    # Проверка даты в формате ГГГГ-ММ-ДД
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'некорректная дата "{value}"') from None
+
+
+def add_filter_arguments(parser):
+    parser.add_argument('--text', default='', help='текст в заголовке или описании')
+    parser.add_argument('--priority', default='', choices=[''] + PRIORITIES, help='приоритет')
+    parser.add_argument('--from', dest='start_date', type=iso_date, help='срок не раньше даты')
+    parser.add_argument('--to', dest='end_date', type=iso_date, help='срок не позже даты')
+
+
+def task_filter_from_args(args):
+    # Фильтр требует обе границы срока, поэтому недостающая граница заменяется крайним значением
+    start_date = end_date = ''
+    if args.start_date or args.end_date:
+        start_date = args.start_date or '0001-01-01'
+        end_date = args.end_date or '9999-12-31'
+    priority = priority_value(args.priority) if args.priority else None
+    return TaskFilter(args.text, priority, start_date, end_date)
+
+
+def resolve_user(db_manager, username):
+    user_id = db_manager.get_user_id(username)
+    if user_id is None:
+        raise CliError(f'пользователь "{username}" не найден')
+    return user_id
+
+
+def command_import(db_manager, args):
+    user_id = resolve_user(db_manager, args.user)
+    inserted, updated, skipped, errors = import_csv_file(db_manager, args.file, user_id)
+    print(f'Добавлено задач: {inserted}, обновлено: {updated}, уже существовало: {skipped}, '
+          f'пропущено некорректных строк: {len(errors)}')
+    for line_num, error in errors[:args.show_errors]:
+        print(f'Строка {line_num}: {error}', file=sys.stderr)
+    return 0
+
+
+def command_export(db_manager, args):
+    user_id = resolve_user(db_manager, args.user)
+    exported = export_csv_file(db_manager, args.file, user_id, task_filter_from_args(args))
+    print(f'Экспортировано задач: {exported}')
+    return 0
+
+
+def command_query(db_manager, args):
+    # Вывод задач в формате CSV в стандартный вывод
+    user_id = resolve_user(db_manager, args.user)
+    batches = db_manager.iter_task_batches(user_id, task_filter_from_args(args))
+    if args.limit is not None:
+        batches = limit_batches(batches, args.limit)
+    write_csv(sys.stdout, batches)
+    return 0
+
+
+def limit_batches(batches, limit):
+    for batch in batches:
+        if limit <= 0:
+            break
+        yield batch[:limit]
+        limit -= len(batch)
+
+
+def command_purge(db_manager, args):
+    user_id = resolve_user(db_manager, args.user)
+    task_filter = task_filter_from_args(args)
+    if not args.all and not (task_filter.text or task_filter.priority is not None or task_filter.start_date):
+        raise CliError('укажите условия фильтра или --all для удаления всех задач пользователя')
+    deleted = db_manager.delete_matching_tasks(user_id, task_filter)
+    print(f'Удалено задач: {deleted}')
+    return 0
+
+
+def command_stats(db_manager, args):
+    user_id = resolve_user(db_manager, args.user) if args.user else None
+    counts = db_manager.priority_counts(user_id)
+    print(f'База: {os.path.abspath(db_manager.path)} ({os.path.getsize(db_manager.path)} байт)')
+    print(f'Версия схемы: {db_manager.schema_version()}')
+    print(f'Полнотекстовый поиск: {"FTS5" if db_manager.fts_enabled else "LIKE"}')
+    print(f'Задач: {sum(counts.values())}')
+    for value, label in enumerate(PRIORITIES):
+        print(f'  {label}: {counts.get(value, 0)}')
+    if user_id is not None:
+        dashboard = db_manager.dashboard_counts(user_id)
+        print(f'Просрочено: {dashboard["overdue"]}')
+        print(f'Срок на этой неделе: {dashboard["due_this_week"]}')
+
+    if args.plans:
+        ok = True
+        for name, plan, uses_index in db_manager.check_query_plans(user_id or 0):
+            ok = ok and uses_index
+            print(f'{"OK " if uses_index else "ПОЛНЫЙ ПРОСМОТР"} {name}: {"; ".join(plan)}')
+        return 0 if ok else 1
+    return 0
+
+
+def iso_moment(value):
+    # Момент времени для журнала изменений: дата или дата и время по UTC
+    try:
+        moment = datetime.datetime.fromisoformat(value.rstrip('Z'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'некорректный момент времени "{value}"') from None
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def command_history(db_manager, args):
+    # Состояние задачи на момент --as-of или изменения после --since
+    user_id = resolve_user(db_manager, args.user)
+    if args.as_of:
+        if args.task is None:
+            raise CliError('для --as-of укажите --task')
+        task = db_manager.task_as_of(args.task, user_id, args.as_of)
+        if task is None:
+            raise CliError(f'задачи {args.task} на момент {args.as_of} не существовало')
+        write_csv(sys.stdout, [[task[1:]]])
+        return 0
+
+    for _, task_id, changed_at, op, delta in db_manager.history_since(
+            user_id, args.since or '', args.task, args.limit):
+        print(f'{changed_at} {op} {task_id} {json.dumps(delta, ensure_ascii=False) if delta else ""}')
+    return 0
+
+
+def command_compact_history(db_manager, args):
+    before = None
+    if args.days is not None:
+        before = (datetime.datetime.now(datetime.timezone.utc)
+                  - datetime.timedelta(days=args.days)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    removed = db_manager.compact_history(before)
+    print(f'Удалено записей журнала: {removed}')
+    return 0
+
+
+def command_rebuild_summary(db_manager, args):
+    # Проверка счетчиков сводки и их пересчет при расхождениях (или всегда с --force)
+    mismatches = db_manager.check_summary()
+    print(f'Расхождений в счетчиках сводки: {mismatches}')
+    if mismatches or args.force:
+        db_manager.rebuild_summary()
+        print('Счетчики пересчитаны')
+    return 0
+
+
+def command_backup(db_manager, args):
+    size = backup_database(db_manager, args.file, args.vacuum)
+    print(f'Снимок базы сохранен: {args.file} ({size} байт)')
+    return 0
+
+
+def command_restore(db_manager, args):
+    restore_database(db_manager, args.file)
+    print(f'База восстановлена из снимка {args.file}, версия схемы: {db_manager.schema_version()}')
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m taskmanager', description='Пакетные операции с задачами')
+    parser.add_argument('--db', default='tasks.db', help='путь к файлу базы данных')
+    parser.add_argument('--profile', metavar='FILE', help='сохранить профиль запросов в JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='импорт задач из CSV')
+    import_parser.add_argument('file')
+    import_parser.add_argument('-u', '--user', required=True)
+    import_parser.add_argument('--show-errors', type=int, default=20, help='сколько ошибок в строках показать')
+    import_parser.set_defaults(handler=command_import)
+
+    export_parser = commands.add_parser('export', help='экспорт задач в CSV')
+    export_parser.add_argument('file')
+    export_parser.add_argument('-u', '--user', required=True)
+    add_filter_arguments(export_parser)
+    export_parser.set_defaults(handler=command_export)
+
+    query_parser = commands.add_parser('query', help='вывод задач в стандартный вывод')
+    query_parser.add_argument('-u', '--user', required=True)
+    query_parser.add_argument('--limit', type=int)
+    add_filter_arguments(query_parser)
+    query_parser.set_defaults(handler=command_query)
+
+    purge_parser = commands.add_parser('purge', help='удаление задач по фильтру')
+    purge_parser.add_argument('-u', '--user', required=True)
+    purge_parser.add_argument('--all', action='store_true', help='удалить все задачи пользователя')
+    add_filter_arguments(purge_parser)
+    purge_parser.set_defaults(handler=command_purge)
+
+    stats_parser = commands.add_parser('stats', help='статистика базы')
+    stats_parser.add_argument('-u', '--user')
+    stats_parser.add_argument('--plans', action='store_true', help='проверить планы запросов фильтрации')
+    stats_parser.set_defaults(handler=command_stats)
+
+    history_parser = commands.add_parser('history', help='журнал изменений задач')
+    history_parser.add_argument('-u', '--user', required=True)
+    history_parser.add_argument('--task', type=int, help='id задачи')
+    history_parser.add_argument('--since', type=iso_moment, help='изменения после момента (UTC)')
+    history_parser.add_argument('--as-of', type=iso_moment, help='состояние задачи на момент (UTC)')
+    history_parser.add_argument('--limit', type=int, default=1000)
+    history_parser.set_defaults(handler=command_history)
+
+    compact_parser = commands.add_parser('compact-history', help='сжатие старых записей журнала изменений')
+    compact_parser.add_argument('--days', type=int,
+                                help=f'хранить подробный журнал за столько дней '
+                                     f'(по умолчанию {DatabaseManager.HISTORY_RETENTION_DAYS})')
+    compact_parser.set_defaults(handler=command_compact_history)
+
+    summary_parser = commands.add_parser('rebuild-summary', help='проверка и пересчет счетчиков сводки')
+    summary_parser.add_argument('--force', action='store_true', help='пересчитать даже без расхождений')
+    summary_parser.set_defaults(handler=command_rebuild_summary)
+
+    backup_parser = commands.add_parser('backup', help='снимок базы без остановки приложения')
+    backup_parser.add_argument('file', help='файл снимка; с расширением .gz снимок сжимается')
+    backup_parser.add_argument('--vacuum', action='store_true',
+                               help='снимок через VACUUM INTO, без свободного места после удалений')
+    backup_parser.set_defaults(handler=command_backup)
+
+    restore_parser = commands.add_parser('restore', help='замена базы снимком')
+    restore_parser.add_argument('file')
+    restore_parser.set_defaults(handler=command_restore)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler = Profiler() if args.profile else None
+    db_manager = DatabaseManager(args.db, profiler=profiler)
+    try:
+        return args.handler(db_manager, args)
+    except (CliError, OSError, ValueError, sqlite3.Error) as e:
+        print(f'Ошибка: {e}', file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close()
+        if profiler is not None:
+            profiler.dump(args.profile)
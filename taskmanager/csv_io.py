@@ -0,0 +1,56 @@
+import io
+import os
+import csv
+
+from .store import PRIORITIES, CSV_HEADER, OperationCancelled
+
+
+def import_csv_file(db_manager, file_path, user_id, progress=None, is_cancelled=None):
+    # Потоковый импорт CSV файла; progress получает процент прочитанных байтов
+    file_size = os.path.getsize(file_path) or 1
+    with open(file_path, 'rb') as raw_file:
+        file = io.TextIOWrapper(raw_file, encoding='utf-8', newline='')
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header != CSV_HEADER:
+            raise ValueError('Выбранный файл не является файлом CSV с задачами.')
+
+        def report_progress():
+            if progress is not None:
+                progress(raw_file.tell() * 100 // file_size)
+
+        rows = ((reader.line_num, row_data) for row_data in reader if row_data)
+        return db_manager.import_tasks(user_id, rows, report_progress, is_cancelled)
+
+
+def write_csv(file, batches, progress=None, is_cancelled=None, total=None):
+    # Запись задач в CSV пачками; номер приоритета заменяется его названием. Возвращает количество записанных строк
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADER)
+    written = 0
+    for batch in batches:
+        if is_cancelled is not None and is_cancelled():
+            raise OperationCancelled()
+        writer.writerows((title, description, deadline, PRIORITIES[priority])
+                         for title, description, deadline, priority in batch)
+        written += len(batch)
+        if progress is not None and total:
+            progress(min(written * 100 // total, 100))
+    return written
+
+
+def export_csv_file(db_manager, file_path, user_id, task_filter=None, progress=None, is_cancelled=None):
+    # Потоковый экспорт задач из курсора; запись во временный файл и замена целевого только после успеха
+    total = db_manager.count_tasks(user_id, task_filter) if progress is not None else None
+    part_path = file_path + '.part'
+    try:
+        with open(part_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as file:
+            batches = db_manager.iter_task_batches(user_id, task_filter)
+            exported = write_csv(file, batches, progress, is_cancelled, total)
+        os.replace(part_path, file_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    return exported
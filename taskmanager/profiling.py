@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import time
+import bisect
+import logging
+import datetime
+import threading
+import contextlib
+import sqlite3
+from collections import deque
+
+
+logger = logging.getLogger('taskmanager.profiling')
+
+DEFAULT_SLOW_MS = 100
+
+
+class LatencyHistogram:
+    # Границы корзин в миллисекундах; последняя корзина — все, что медленнее
+    BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+    def __init__(self, window=1000):
+        # Гистограмма по скользящему окну последних замеров
+        self.samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, duration_ms):
+        self.samples.append(duration_ms)
+        self.total_count += 1
+
+    def summary(self):
+        samples = sorted(self.samples)
+        buckets = [0] * (len(self.BUCKETS_MS) + 1)
+        for duration_ms in samples:
+            buckets[bisect.bisect_left(self.BUCKETS_MS, duration_ms)] += 1
+
+        def percentile(fraction):
+            return round(samples[min(int(len(samples) * fraction), len(samples) - 1)], 3) if samples else None
+
+        labels = [f'<={bound}ms' for bound in self.BUCKETS_MS] + [f'>{self.BUCKETS_MS[-1]}ms']
+        return {
+            'count': self.total_count,
+            'window': len(samples),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1], 3) if samples else None,
+            'buckets': dict(zip(labels, buckets)),
+        }
+
+
+class Profiler:
+    def __init__(self, slow_threshold_ms=None, window=1000, slow_log_size=200):
+        # Порог медленной операции можно задать переменной окружения TASKMANAGER_SLOW_MS
+        if slow_threshold_ms is None:
+            slow_threshold_ms = float(os.environ.get('TASKMANAGER_SLOW_MS', DEFAULT_SLOW_MS))
+        self.slow_threshold_ms = slow_threshold_ms
+        self.window = window
+        self.histograms = {}
+        self.statements = {}
+        self.slow_operations = deque(maxlen=slow_log_size)
+        self.lock = threading.Lock()
+
+    def record(self, category, name, duration_ms, rows=None):
+        # Учет одного замера: гистограмма категории, сводка по имени и журнал медленных операций
+        with self.lock:
+            histogram = self.histograms.get(category)
+            if histogram is None:
+                histogram = self.histograms[category] = LatencyHistogram(self.window)
+            histogram.add(duration_ms)
+
+            stats = self.statements.get((category, name))
+            if stats is None:
+                stats = self.statements[(category, name)] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            if rows is not None and rows > 0:
+                stats['rows'] += rows
+
+            slow = duration_ms >= self.slow_threshold_ms
+            if slow:
+                self.slow_operations.append({
+                    'time': datetime.datetime.now().isoformat(timespec='milliseconds'),
+                    'category': category,
+                    'name': name,
+                    'ms': round(duration_ms, 3),
+                    'rows': rows,
+                })
+        if slow:
+            logger.warning('Медленная операция (%s) %.1f мс: %s', category, duration_ms, name)
+
+    def add_fetch(self, category, name, rows, duration_ms):
+        # Строки и время чтения из курсора уже после выполнения запроса
+        with self.lock:
+            stats = self.statements.get((category, name))
+            if stats is not None:
+                stats['rows'] += rows
+                stats['total_ms'] += duration_ms
+
+    @contextlib.contextmanager
+    def measure(self, category, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(category, name, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self, top=50):
+        # Текущее состояние профиля в виде, пригодном для JSON
+        with self.lock:
+            categories = {category: histogram.summary() for category, histogram in self.histograms.items()}
+            operations = [
+                dict(category=category, name=name, count=stats['count'], rows=stats['rows'],
+                     total_ms=round(stats['total_ms'], 3), max_ms=round(stats['max_ms'], 3),
+                     avg_ms=round(stats['total_ms'] / stats['count'], 3))
+                for (category, name), stats in self.statements.items()
+            ]
+            slow_operations = list(self.slow_operations)
+        operations.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'categories': categories,
+            'operations': operations[:top],
+            'slow_operations': slow_operations,
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False, indent=2)
+
+
+def statement_name(sql):
+    # Нормализация текста запроса для группировки: пробелы схлопываются, длинные запросы обрезаются
+    name = re.sub(r'\s+', ' ', sql).strip()
+    return name if len(name) <= 160 else name[:157] + '...'
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Курсор, замеряющий выполнение запросов и считающий прочитанные строки
+    def execute(self, sql, parameters=()):
+        self.statement = statement_name(sql)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.profiler.record(
+                'query', self.statement, (time.perf_counter() - started) * 1000, self.changed_rows()
+            )
+
+    def executemany(self, sql, seq_of_parameters):
+        self.statement = statement_name(sql)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.profiler.record(
+                'query', self.statement, (time.perf_counter() - started) * 1000, self.changed_rows()
+            )
+
+    def changed_rows(self):
+        # Для SELECT rowcount равен -1: строки учитываются при чтении из курсора
+        return self.rowcount if self.rowcount >= 0 else None
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self.count_fetched(0 if row is None else 1, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.count_fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self.count_fetched(len(rows), started)
+        return rows
+
+    def count_fetched(self, rows, started):
+        statement = getattr(self, 'statement', None)
+        if statement is not None:
+            self.connection.profiler.add_fetch(
+                'query', statement, rows, (time.perf_counter() - started) * 1000
+            )
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Соединение с замером запросов и коммитов; profiler назначается после открытия
+    profiler = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        # Встроенный Connection.execute создает курсор в обход cursor(), поэтому переопределяется явно
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self.profiler.record('commit', 'COMMIT', (time.perf_counter() - started) * 1000)
@@ -0,0 +1,94 @@
+import heapq
+import datetime
+
+
+REMIND_AT = datetime.time(9, 0)
+
+
+def due_time(deadline):
+    # Напоминание о задаче приходит утром в день срока
+    return datetime.datetime.combine(datetime.date.fromisoformat(deadline), REMIND_AT)
+
+
+class ReminderQueue:
+    WINDOW = 500
+
+    def __init__(self, db_manager):
+        # В памяти держится только окно ближайших сроков; остальные дочитываются из базы по мере срабатывания
+        self.db_manager = db_manager
+        self.user_id = None
+        self.heap = []
+        self.pending = {}
+        self.notified = {}
+        self.horizon = None
+
+    def load(self, user_id):
+        # Начальное заполнение: сроки начиная с сегодняшнего дня (прошедшие сроки не напоминаются)
+        self.user_id = user_id
+        self.heap = []
+        self.pending = {}
+        self.horizon = (self.start_deadline(), 0)
+        self.refill()
+
+    def refill(self):
+        # Дочитывание следующего окна; horizon — ключ (deadline, id) последней прочитанной задачи,
+        # None означает, что все будущие сроки уже в очереди
+        while not self.pending and self.horizon is not None:
+            rows = self.db_manager.fetch_deadlines_page(self.user_id, self.horizon, self.WINDOW)
+            for task_id, title, deadline in rows:
+                self.push(task_id, title, deadline)
+            self.horizon = (rows[-1][2], rows[-1][0]) if len(rows) == self.WINDOW else None
+
+    def push(self, task_id, title, deadline):
+        if self.notified.get(task_id) == deadline:
+            return
+        self.pending[task_id] = (deadline, title)
+        heapq.heappush(self.heap, (deadline, task_id))
+
+    def add(self, task_id, title, deadline):
+        # Задачи за горизонтом окна не добавляются: они будут прочитаны из базы при дочитывании
+        if self.user_id is None or deadline < self.start_deadline():
+            return
+        if self.horizon is None or (deadline, task_id) <= self.horizon:
+            self.push(task_id, title, deadline)
+
+    def update(self, task_id, title, deadline):
+        self.pending.pop(task_id, None)
+        self.add(task_id, title, deadline)
+        self.refill()
+
+    def remove(self, task_id):
+        # Запись в куче становится устаревшей и пропускается при извлечении
+        self.pending.pop(task_id, None)
+        self.refill()
+
+    def start_deadline(self):
+        return datetime.date.today().isoformat()
+
+    def peek(self):
+        # Ближайшая действительная запись; устаревшие записи (удаленные или измененные задачи) отбрасываются
+        while self.heap:
+            deadline, task_id = self.heap[0]
+            entry = self.pending.get(task_id)
+            if entry is not None and entry[0] == deadline:
+                return deadline, task_id
+            heapq.heappop(self.heap)
+        return None
+
+    def next_due(self):
+        entry = self.peek()
+        return due_time(entry[0]) if entry is not None else None
+
+    def pop_due(self, now):
+        # Извлечение всех задач, время напоминания которых наступило; возвращает (id, заголовок, срок)
+        due = []
+        while True:
+            entry = self.peek()
+            if entry is None or due_time(entry[0]) > now:
+                break
+            deadline, task_id = heapq.heappop(self.heap)
+            title = self.pending.pop(task_id)[1]
+            self.notified[task_id] = deadline
+            due.append((task_id, title, deadline))
+            self.refill()
+        return due
@@ -0,0 +1,1056 @@
+import re
+import json
+import hashlib
+import datetime
+import threading
+import sqlite3
+from array import array
+
+from .profiling import InstrumentedConnection
+
+
+PRIORITIES = ['Низкий', 'Средний', 'Высокий']
+CSV_HEADER = ['Заголовок', 'Описание', 'Срок исполнения', 'Приоритет']
+
+
+def _migration_initial_schema(conn):
+    # Базовая схема; IF NOT EXISTS сохраняет таблицы, созданные версиями без миграций
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            title TEXT,
+            description TEXT,
+            deadline DATE,
+            priority TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def _migration_task_indexes(conn):
+    # Индекс (user_id) отдает задачи пользователя уже упорядоченными по id для постраничной выборки,
+    # составные индексы обслуживают фильтры по сроку и приоритету
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_deadline ON tasks (user_id, deadline)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_priority ON tasks (user_id, priority)')
+
+
+def fts5_available():
+    # Проверка, собран ли SQLite с поддержкой полнотекстового поиска FTS5
+    options = [row[0] for row in sqlite3.connect(':memory:').execute('PRAGMA compile_options')]
+    return 'ENABLE_FTS5' in options
+
+
+def _migration_task_fts(conn):
+    # Полнотекстовый индекс по заголовку и описанию, синхронизируемый триггерами.
+    # Без FTS5 миграция пропускается, и фильтр по тексту работает через LIKE
+    if not fts5_available():
+        return
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+HISTORY_FIELDS = ['title', 'description', 'deadline', 'priority']
+
+
+def _migration_task_history(conn):
+    # Журнал изменений задач только на добавление. Записи пишут триггеры в той же транзакции, что и само изменение.
+    # I — полный снимок задачи, U — только измененные поля, D — удаление.
+    # json_patch отбрасывает ключи со значением null, поэтому в delta попадают лишь изменившиеся поля
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+            op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D')),
+            delta TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_task_history_task ON task_history (task_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_task_history_user_time ON task_history (user_id, changed_at)')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_history_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_history (task_id, user_id, op, delta)
+            VALUES (new.id, new.user_id, 'I', json_object(
+                'title', new.title, 'description', new.description,
+                'deadline', new.deadline, 'priority', new.priority
+            ));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_history_update AFTER UPDATE ON tasks
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+            OR old.deadline IS NOT new.deadline OR old.priority IS NOT new.priority
+        BEGIN
+            INSERT INTO task_history (task_id, user_id, op, delta)
+            VALUES (new.id, new.user_id, 'U', json_patch('{}', json_object(
+                'title', CASE WHEN old.title IS NOT new.title THEN new.title END,
+                'description', CASE WHEN old.description IS NOT new.description THEN new.description END,
+                'deadline', CASE WHEN old.deadline IS NOT new.deadline THEN new.deadline END,
+                'priority', CASE WHEN old.priority IS NOT new.priority THEN new.priority END
+            )));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_history_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_history (task_id, user_id, op) VALUES (old.id, old.user_id, 'D');
+        END
+    ''')
+    # Существующие задачи получают начальный снимок, чтобы состояние на момент T восстанавливалось для всех задач
+    conn.execute('''
+        INSERT INTO task_history (task_id, user_id, op, delta)
+        SELECT id, user_id, 'I', json_object(
+            'title', title, 'description', description, 'deadline', deadline, 'priority', priority
+        )
+        FROM tasks
+    ''')
+
+
+def _rebuild_tasks_table(conn, columns_sql, insert_columns, select_sql):
+    # Пересоздание таблицы задач (SQLite не меняет тип и порядок столбцов): индексы и триггеры (FTS, журнал)
+    # создаются заново по их сохраненному определению, а счетчик AUTOINCREMENT сохраняется,
+    # чтобы id удаленных задач не использовались повторно
+    schema = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name='tasks' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='tasks'").fetchone()
+
+    conn.execute(f'CREATE TABLE tasks_new ({columns_sql})')
+    conn.execute(f'INSERT INTO tasks_new ({insert_columns}) {select_sql}')
+    conn.execute('DROP TABLE tasks')
+    conn.execute('ALTER TABLE tasks_new RENAME TO tasks')
+    for sql in schema:
+        conn.execute(sql)
+    if sequence is not None:
+        conn.execute("UPDATE sqlite_sequence SET seq=? WHERE name='tasks'", sequence)
+
+
+def _migration_integer_priority(conn):
+    # Приоритет хранится номером в PRIORITIES, чтобы сортировка по нему была правильной и шла по индексу
+    priority_case = 'CASE priority ' + ' '.join(
+        f"WHEN '{label}' THEN {value}" for value, label in enumerate(PRIORITIES)
+    ) + ' ELSE 0 END'
+
+    # Пустые заголовок и срок заменяют NULL: ключ постраничной выборки при сортировке не должен содержать NULL
+    _rebuild_tasks_table(conn, """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        title TEXT NOT NULL,
+        description TEXT,
+        deadline DATE NOT NULL,
+        priority INTEGER NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    """, 'id, user_id, title, description, deadline, priority', f"""
+        SELECT id, user_id, COALESCE(title, ''), description, COALESCE(deadline, ''), {priority_case}
+        FROM tasks
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_user_title ON tasks (user_id, title)')
+
+    conn.execute(f'''
+        UPDATE task_history
+        SET delta = json_set(delta, '$.priority', (
+            SELECT {priority_case} FROM (SELECT json_extract(delta, '$.priority') AS priority)
+        ))
+        WHERE json_type(delta, '$.priority') = 'text'
+    ''')
+
+
+DESCRIPTION_PREVIEW_CHARS = 200
+
+
+def generated_columns_available():
+    # Вычисляемые столбцы поддерживаются начиная с SQLite 3.31
+    return sqlite3.sqlite_version_info >= (3, 31, 0)
+
+
+def _migration_description_preview(conn):
+    # Описание переносится в конец строки, а перед ним хранится вычисляемое начало описания.
+    # Запросы списка читают только столбцы до описания, и длинные описания (страницы переполнения)
+    # не читаются с диска. Без поддержки вычисляемых столбцов миграция пропускается,
+    # и начало описания вычисляется в запросе
+    if not generated_columns_available():
+        return
+    _rebuild_tasks_table(conn, f"""
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        title TEXT NOT NULL,
+        deadline DATE NOT NULL,
+        priority INTEGER NOT NULL,
+        preview TEXT GENERATED ALWAYS AS (substr(description, 1, {DESCRIPTION_PREVIEW_CHARS})) STORED,
+        description TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    """, 'id, user_id, title, deadline, priority, description', """
+        SELECT id, user_id, title, deadline, priority, description FROM tasks
+    """)
+
+
+def rebuild_task_summary(conn):
+    # Пересчет счетчиков сводки по таблице задач (после миграции или для восстановления)
+    conn.execute('DELETE FROM task_counts_priority')
+    conn.execute('DELETE FROM task_counts_deadline')
+    conn.execute('''
+        INSERT INTO task_counts_priority (user_id, priority, count)
+        SELECT user_id, priority, COUNT(*) FROM tasks GROUP BY user_id, priority
+    ''')
+    conn.execute('''
+        INSERT INTO task_counts_deadline (user_id, deadline, count)
+        SELECT user_id, deadline, COUNT(*) FROM tasks GROUP BY user_id, deadline
+    ''')
+
+
+def _migration_task_summary(conn):
+    # Счетчики задач по приоритетам и по датам сроков, которые триггеры поддерживают в той же транзакции,
+    # что и изменение задачи. Сводка читает несколько строк счетчиков вместо подсчета по таблице задач
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_counts_priority (
+            user_id INTEGER,
+            priority INTEGER,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, priority)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_counts_deadline (
+            user_id INTEGER,
+            deadline DATE,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, deadline)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_summary_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counts_priority (user_id, priority, count) VALUES (new.user_id, new.priority, 1)
+            ON CONFLICT (user_id, priority) DO UPDATE SET count = count + 1;
+            INSERT INTO task_counts_deadline (user_id, deadline, count) VALUES (new.user_id, new.deadline, 1)
+            ON CONFLICT (user_id, deadline) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_summary_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_counts_priority SET count = count - 1
+            WHERE user_id IS old.user_id AND priority = old.priority;
+            UPDATE task_counts_deadline SET count = count - 1
+            WHERE user_id IS old.user_id AND deadline = old.deadline;
+            DELETE FROM task_counts_deadline WHERE user_id IS old.user_id AND deadline = old.deadline AND count = 0;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS task_summary_update AFTER UPDATE OF user_id, priority, deadline ON tasks
+        WHEN old.user_id IS NOT new.user_id OR old.priority IS NOT new.priority OR old.deadline IS NOT new.deadline
+        BEGIN
+            UPDATE task_counts_priority SET count = count - 1
+            WHERE user_id IS old.user_id AND priority = old.priority;
+            INSERT INTO task_counts_priority (user_id, priority, count) VALUES (new.user_id, new.priority, 1)
+            ON CONFLICT (user_id, priority) DO UPDATE SET count = count + 1;
+            UPDATE task_counts_deadline SET count = count - 1
+            WHERE user_id IS old.user_id AND deadline = old.deadline;
+            INSERT INTO task_counts_deadline (user_id, deadline, count) VALUES (new.user_id, new.deadline, 1)
+            ON CONFLICT (user_id, deadline) DO UPDATE SET count = count + 1;
+            DELETE FROM task_counts_deadline WHERE user_id IS old.user_id AND deadline = old.deadline AND count = 0;
+        END
+    ''')
+    rebuild_task_summary(conn)
+
+
+def task_content_hash(title, description, deadline):
+    # Устойчивый 64-битный хеш содержимого задачи (заголовок, описание, срок) для распознавания повторного импорта.
+    # Целое число занимает в индексе мало места и передается в запрос внутри JSON.
+    # Пустое описание и NULL дают один хеш: при экспорте в CSV NULL записывается пустой строкой
+    content = '\x00'.join((title, description or '', deadline)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(content, digest_size=8).digest(), 'big', signed=True)
+
+
+def _migration_content_hash(conn):
+    # Хеш содержимого с уникальным индексом (user_id, content_hash): импорт пропускает уже существующие задачи
+    # вставкой с ON CONFLICT. Среди уже накопившихся дубликатов хеш получает задача с наименьшим id,
+    # у остальных он остается NULL (NULL не участвует в проверке уникальности)
+    conn.execute('ALTER TABLE tasks ADD COLUMN content_hash INTEGER')
+    conn.execute('''
+        UPDATE tasks SET content_hash = task_hash(title, description, deadline)
+        WHERE id IN (SELECT MIN(id) FROM tasks GROUP BY user_id, task_hash(title, description, deadline))
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_user_hash ON tasks (user_id, content_hash)')
+
+
+def _migration_content_hash_handover(conn):
+    # Хеш освобождается, когда его владелец удален или изменил содержимое. Тогда хеш переходит к самому раннему
+    # дубликату с тем же содержимым (у дубликатов хеш NULL), иначе повторный импорт снова добавил бы задачу.
+    # Дубликат ищется по совпадению полей, без функции task_hash: триггеры работают в любом соединении
+    twin = '''
+        SELECT id FROM tasks
+        WHERE user_id = old.user_id AND content_hash IS NULL AND id <> old.id
+            AND title = old.title AND deadline = old.deadline
+            AND COALESCE(description, '') = COALESCE(old.description, '')
+        ORDER BY id LIMIT 1
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_hash_release_delete AFTER DELETE ON tasks
+        WHEN old.content_hash IS NOT NULL
+        BEGIN
+            UPDATE tasks SET content_hash = old.content_hash WHERE id = ({twin});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_hash_release_update AFTER UPDATE OF content_hash ON tasks
+        WHEN old.content_hash IS NOT NULL AND new.content_hash IS NULL
+        BEGIN
+            UPDATE tasks SET content_hash = old.content_hash WHERE id = ({twin});
+        END
+    ''')
+    # Хеши, освобожденные до появления триггеров, получают оставшиеся дубликаты
+    conn.execute('''
+        UPDATE OR IGNORE tasks SET content_hash = task_hash(title, description, deadline)
+        WHERE content_hash IS NULL
+    ''')
+
+
+# Миграции применяются по порядку; номер миграции равен ее позиции в списке
+MIGRATIONS = [
+    _migration_initial_schema,
+    _migration_task_indexes,
+    _migration_task_fts,
+    _migration_task_history,
+    _migration_integer_priority,
+    _migration_description_preview,
+    _migration_task_summary,
+    _migration_content_hash,
+    _migration_content_hash_handover,
+]
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+def parse_task_row(row_data):
+    # Проверка строки CSV и преобразование ее в данные задачи
+    if len(row_data) != len(CSV_HEADER):
+        raise ValueError(f'ожидалось {len(CSV_HEADER)} столбца, получено {len(row_data)}')
+
+    title, description, deadline, priority = row_data
+    if not title:
+        raise ValueError('пустой заголовок')
+    try:
+        datetime.date.fromisoformat(deadline)
+    except ValueError:
+        raise ValueError(f'некорректный срок "{deadline}"') from None
+    return title, description, deadline, priority_value(priority)
+
+
+def priority_value(label):
+    # Номер приоритета, хранимый в базе, по его названию
+    try:
+        return PRIORITIES.index(label)
+    except ValueError:
+        raise ValueError(f'неизвестный приоритет "{label}"') from None
+
+
+def fold_history(state, op, delta):
+    # Применение одной записи журнала к состоянию задачи (словарю полей)
+    if op == 'D':
+        return None
+    if op == 'I':
+        return json.loads(delta)
+    state = dict(state or {})
+    state.update(json.loads(delta))
+    return state
+
+
+class TaskFilter:
+    def __init__(self, text='', priority=None, start_date='', end_date=''):
+        # Параметры фильтрации задач; priority — номер в PRIORITIES или None
+        self.text = text
+        self.priority = priority
+        self.start_date = start_date
+        self.end_date = end_date
+
+
+class DatabaseManager:
+    IMPORT_CHUNK_SIZE = 1000
+    BUSY_TIMEOUT_MS = 5000
+    CACHED_STATEMENTS = 256
+    HISTORY_RETENTION_DAYS = 365
+    # Столбцы, по которым возможна сортировка, и их позиция в строке задачи
+    SORT_COLUMNS = {'title': 1, 'deadline': 3, 'priority': 4}
+    # Начало описания для списка задач, если в схеме нет вычисляемого столбца preview
+    PREVIEW_EXPRESSION = f'substr(description, 1, {DESCRIPTION_PREVIEW_CHARS})'
+
+    def __init__(self, path='tasks.db', migrate=True, profiler=None):
+        # При migrate=False схему готовит вызывающий код (например, фоновый поток при запуске).
+        # Если передан profiler, все запросы и коммиты замеряются
+        self.path = path
+        self.profiler = profiler
+        self.local = threading.local()
+        self.fts_enabled = False
+        self.preview_column = self.PREVIEW_EXPRESSION
+        if migrate:
+            self.migrate()
+
+    @property
+    def conn(self):
+        # Соединение текущего потока; SQLite-соединения нельзя разделять между потоками
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            self.local.conn = conn
+        return conn
+
+    def connect(self):
+        # Открытие соединения: WAL позволяет читателям не блокировать писателя и наоборот,
+        # synchronous=NORMAL в режиме WAL убирает fsync на каждом коммите
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.BUSY_TIMEOUT_MS / 1000,
+            cached_statements=self.CACHED_STATEMENTS,
+            factory=InstrumentedConnection if self.profiler is not None else sqlite3.Connection
+        )
+        if self.profiler is not None:
+            conn.profiler = self.profiler
+        conn.create_function('task_hash', 3, task_content_hash, deterministic=True)
+        conn.execute(f'PRAGMA busy_timeout = {self.BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def close(self):
+        # Закрытие соединения текущего потока (вызывается рабочими потоками по завершении)
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def migrate(self):
+        # Применение недостающих миграций схемы; номер версии хранится в PRAGMA user_version
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] >= number:
+                continue
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Повторная проверка под блокировкой: миграцию мог применить другой процесс
+                if self.conn.execute('PRAGMA user_version').fetchone()[0] < number:
+                    migration(self.conn)
+                    self.conn.execute(f'PRAGMA user_version = {number}')
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+        self.fts_enabled = fts5_available() and self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tasks_fts'"
+        ).fetchone() is not None
+        has_preview = self.conn.execute(
+            "SELECT 1 FROM pragma_table_xinfo('tasks') WHERE name='preview'"
+        ).fetchone() is not None
+        self.preview_column = 'preview' if has_preview else self.PREVIEW_EXPRESSION
+
+    def warm_cache(self):
+        # Прогрев файлового кэша ОС: чтение индекса задач и таблицы пользователей,
+        # которые понадобятся сразу после входа
+        self.conn.execute('SELECT COUNT(*) FROM tasks INDEXED BY idx_tasks_user').fetchone()
+        self.conn.execute('SELECT COUNT(*) FROM users').fetchone()
+
+    def schema_version(self):
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def priority_counts(self, user_id=None):
+        # Количество задач по номерам приоритетов для пользователя или по всей базе (из счетчиков сводки)
+        if user_id is None:
+            cur = self.conn.execute('SELECT priority, SUM(count) FROM task_counts_priority GROUP BY priority')
+        else:
+            cur = self.conn.execute(
+                'SELECT priority, count FROM task_counts_priority WHERE user_id=?', (user_id,)
+            )
+        return {priority: count for priority, count in cur.fetchall() if count}
+
+    def deadline_count(self, user_id, start_date=None, end_date=None):
+        # Количество задач со сроком в диапазоне дат (границы включительно) по счетчикам сводки:
+        # суммируется по строке на каждую дату, а не по задачам
+        query = 'user_id=?'
+        params = (user_id,)
+        if start_date is not None:
+            query += ' AND deadline >= ?'
+            params += (start_date,)
+        if end_date is not None:
+            query += ' AND deadline <= ?'
+            params += (end_date,)
+        cur = self.conn.execute(f'SELECT COALESCE(SUM(count), 0) FROM task_counts_deadline WHERE {query}', params)
+        return cur.fetchone()[0]
+
+    def dashboard_counts(self, user_id, today=None):
+        # Данные сводки: задачи по приоритетам, просроченные и со сроком до конца текущей недели
+        today = today or datetime.date.today()
+        week_end = today + datetime.timedelta(days=6 - today.weekday())
+        by_priority = self.priority_counts(user_id)
+        return {
+            'total': sum(by_priority.values()),
+            'priorities': by_priority,
+            'overdue': self.deadline_count(user_id, end_date=(today - datetime.timedelta(days=1)).isoformat()),
+            'due_this_week': self.deadline_count(user_id, today.isoformat(), week_end.isoformat()),
+        }
+
+    def rebuild_summary(self):
+        # Восстановление счетчиков сводки полным пересчетом
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rebuild_task_summary(self.conn)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def check_summary(self):
+        # Сравнение счетчиков сводки с фактическими данными в обе стороны; возвращает число расхождений
+        mismatches = 0
+        for column, table in (('priority', 'task_counts_priority'), ('deadline', 'task_counts_deadline')):
+            actual = f'SELECT user_id, {column}, COUNT(*) FROM tasks GROUP BY user_id, {column}'
+            stored = f'SELECT user_id, {column}, count FROM {table} WHERE count != 0'
+            for first, second in ((actual, stored), (stored, actual)):
+                mismatches += self.conn.execute(
+                    f'SELECT COUNT(*) FROM ({first} EXCEPT {second})'
+                ).fetchone()[0]
+        return mismatches
+
+    def explain_query_plan(self, query, params=()):
+        # Получение плана выполнения запроса (столбец detail из EXPLAIN QUERY PLAN)
+        return [row[3] for row in self.conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+
+    def check_query_plans(self, user_id=0):
+        # Проверка, что запросы списка и фильтрации задач используют индексы, а не полный просмотр таблицы
+        filters = {
+            'все задачи': None,
+            'приоритет': TaskFilter(priority=0),
+            'срок': TaskFilter(start_date='2000-01-01', end_date='2000-12-31'),
+            'приоритет и срок': TaskFilter(priority=0, start_date='2000-01-01', end_date='2000-12-31'),
+        }
+        results = []
+        for name, task_filter in filters.items():
+            query, params = self.task_conditions(user_id, task_filter)
+            for kind, sql, sql_params in (
+                ('страница', f'SELECT id FROM tasks WHERE {query} AND id > ? ORDER BY id LIMIT 200', params + (0,)),
+                ('подсчет', f'SELECT COUNT(*) FROM tasks WHERE {query}', params),
+            ):
+                plan = self.explain_query_plan(sql, sql_params)
+                uses_index = all(not detail.startswith('SCAN') and 'TEMP B-TREE' not in detail for detail in plan)
+                results.append((f'{name} ({kind})', plan, uses_index))
+
+        # Сортированная страница: временное B-дерево допустимо только для слияния двух ограниченных выборок
+        for column in self.SORT_COLUMNS:
+            for descending in (False, True):
+                sql, sql_params = self.sorted_page_query('user_id=?', (user_id,), column, descending, ('', 0), 200)
+                plan = self.explain_query_plan(sql, sql_params)
+                uses_index = all(not detail.startswith('SCAN tasks') for detail in plan)
+                results.append((f'сортировка {column} {"по убыванию" if descending else "по возрастанию"}',
+                                plan, uses_index))
+
+        plan = self.explain_query_plan('''
+            SELECT id, title, deadline FROM tasks
+            WHERE user_id=? AND (deadline, id) > (?, ?) ORDER BY deadline, id LIMIT 500
+        ''', (user_id, '2000-01-01', 0))
+        uses_index = all(not detail.startswith('SCAN') and 'TEMP B-TREE' not in detail for detail in plan)
+        results.append(('ближайшие сроки (напоминания)', plan, uses_index))
+
+        for name, sql, params in (
+            ('журнал: задача на момент', '''
+                SELECT op, delta FROM task_history INDEXED BY idx_task_history_task
+                WHERE task_id=? AND user_id=? AND changed_at <= ? ORDER BY id
+            ''', (0, user_id, '2000-01-01')),
+            ('журнал: изменения после курсора синхронизации', '''
+                SELECT task_id FROM task_history
+                WHERE id > ? AND id <= ? AND +user_id=? ORDER BY id
+            ''', (0, 0, user_id)),
+            ('журнал: изменения после момента', '''
+                SELECT id, task_id, changed_at, op, delta FROM task_history
+                WHERE user_id=? AND changed_at > ? ORDER BY changed_at, id LIMIT 1000
+            ''', (user_id, '2000-01-01')),
+        ):
+            plan = self.explain_query_plan(sql, params)
+            uses_index = all(not detail.startswith('SCAN') and 'TEMP B-TREE' not in detail for detail in plan)
+            results.append((name, plan, uses_index))
+        return results
+
+    def add_user(self, username, password):
+        # Добавление нового пользователя
+        self.conn.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, password))
+        self.conn.commit()
+
+    def check_login(self, username, password):
+        # Проверка логина и пароля при входе
+        cur = self.conn.execute('SELECT * FROM users WHERE username=? AND password=?', (username, password))
+        return cur.fetchone()
+
+    def add_task(self, user_id, title, description, deadline, priority):
+        # Добавление новой задачи; возвращает ее id
+        cur = self.conn.execute('''
+            INSERT INTO tasks (user_id, title, description, deadline, priority)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, title, description, deadline, priority))
+        self.assign_content_hashes(user_id, [cur.lastrowid])
+        self.conn.commit()
+        return cur.lastrowid
+
+    def get_user_id(self, username):
+        # Получение ID пользователя по его имени
+        cur = self.conn.execute('SELECT id FROM users WHERE username=?', (username,))
+        user_id = cur.fetchone()
+        return user_id[0] if user_id else None
+
+    def get_username(self, user_id):
+        # Получение имени пользователя по его ID
+        cur = self.conn.execute('SELECT username FROM users WHERE id=?', (user_id,))
+        username = cur.fetchone()
+        return username[0] if username else None
+
+    def update_task(self, task_id, user_id, title, description, deadline, priority):
+        # Редактирование задачи по первичному ключу. Хеш содержимого сбрасывается, только если изменились
+        # заголовок, описание или срок (в SET столбцы имеют значения до изменения)
+        self.conn.execute('''
+            UPDATE tasks
+            SET content_hash = CASE
+                    WHEN title = ? AND COALESCE(description, '') = ? AND deadline = ? THEN content_hash
+                END,
+                title=?, description=?, deadline=?, priority=?
+            WHERE id=? AND user_id=?
+        ''', (title, description or '', deadline, title, description, deadline, priority, task_id, user_id))
+        self.assign_content_hashes(user_id, [task_id])
+        self.conn.commit()
+
+    def delete_task(self, task_id, user_id):
+        # Удаление задачи по первичному ключу
+        self.conn.execute('DELETE FROM tasks WHERE id=? AND user_id=?', (task_id, user_id))
+        self.conn.commit()
+
+    def delete_tasks(self, user_id, task_ids):
+        # Удаление набора задач одним запросом и одной транзакцией; возвращает количество удаленных
+        cur = self.conn.execute(
+            'DELETE FROM tasks WHERE user_id=? AND id IN (SELECT value FROM json_each(?))',
+            (user_id, json.dumps(list(task_ids)))
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def update_tasks(self, user_id, task_ids, deadline=None, priority=None):
+        # Изменение срока и/или приоритета набора задач одним запросом; None оставляет поле без изменений.
+        # Возвращает количество измененных задач
+        assignments = []
+        params = ()
+        if deadline is not None:
+            # Срок входит в хеш содержимого, поэтому при изменении срока хеш пересчитывается
+            assignments.append('deadline=?, content_hash = CASE WHEN deadline = ? THEN content_hash END')
+            params += (deadline, deadline)
+        if priority is not None:
+            assignments.append('priority=?')
+            params += (priority,)
+        if not assignments:
+            return 0
+        cur = self.conn.execute(f'''
+            UPDATE tasks SET {', '.join(assignments)}
+            WHERE user_id=? AND id IN (SELECT value FROM json_each(?))
+        ''', params + (user_id, json.dumps(list(task_ids))))
+        if deadline is not None:
+            self.assign_content_hashes(user_id, task_ids)
+        self.conn.commit()
+        return cur.rowcount
+
+    def assign_content_hashes(self, user_id, task_ids):
+        # Запись хеша содержимого задачам без коммита. Если такой хеш уже есть у другой задачи пользователя,
+        # OR IGNORE оставляет NULL: дубликаты, созданные вручную, допускаются, но не становятся целью импорта
+        self.conn.execute('''
+            UPDATE OR IGNORE tasks SET content_hash = task_hash(title, description, deadline)
+            WHERE user_id=? AND id IN (SELECT value FROM json_each(?))
+        ''', (user_id, json.dumps(list(task_ids))))
+
+    def delete_matching_tasks(self, user_id, task_filter=None):
+        # Удаление всех задач пользователя, подходящих под фильтр, одним запросом; возвращает их количество
+        query, params = self.task_conditions(user_id, task_filter)
+        cur = self.conn.execute(f'DELETE FROM tasks WHERE {query}', params)
+        self.conn.commit()
+        return cur.rowcount
+
+    def task_as_of(self, task_id, user_id, moment):
+        # Состояние задачи на момент moment (ISO 8601, UTC) по журналу изменений; None, если задачи тогда не было.
+        # Записи одной задачи немногочисленны, поэтому выборка всегда идет по индексу task_id
+        cur = self.conn.execute('''
+            SELECT op, delta FROM task_history INDEXED BY idx_task_history_task
+            WHERE task_id=? AND user_id=? AND changed_at <= ?
+            ORDER BY id
+        ''', (task_id, user_id, moment))
+        state = None
+        for op, delta in cur.fetchall():
+            state = fold_history(state, op, delta)
+        if state is None:
+            return None
+        return (task_id,) + tuple(state.get(field) for field in HISTORY_FIELDS)
+
+    def history_since(self, user_id, moment, task_id=None, limit=1000):
+        # Изменения задач пользователя после момента moment: (id записи, id задачи, время, операция, поля)
+        query = 'user_id=? AND changed_at > ?'
+        params = (user_id, moment)
+        if task_id is not None:
+            query += ' AND task_id=?'
+            params += (task_id,)
+        cur = self.conn.execute(f'''
+            SELECT id, task_id, changed_at, op, delta FROM task_history
+            WHERE {query}
+            ORDER BY changed_at, id
+            LIMIT ?
+        ''', params + (limit,))
+        return [(entry_id, entry_task_id, changed_at, op, json.loads(delta) if delta else None)
+                for entry_id, entry_task_id, changed_at, op, delta in cur.fetchall()]
+
+    def compact_history(self, before=None):
+        # Сжатие журнала старше before (по умолчанию старше HISTORY_RETENTION_DAYS дней):
+        # история удаленных до этого момента задач стирается, остальные записи задачи сворачиваются в один снимок.
+        # Возвращает число удаленных записей журнала
+        if before is None:
+            before = (datetime.datetime.now(datetime.timezone.utc)
+                      - datetime.timedelta(days=self.HISTORY_RETENTION_DAYS)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        removed = 0
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            removed += self.conn.execute('''
+                DELETE FROM task_history WHERE task_id IN (
+                    SELECT task_id FROM task_history WHERE op='D' AND changed_at < ?
+                )
+            ''', (before,)).rowcount
+
+            task_ids = [row[0] for row in self.conn.execute('''
+                SELECT task_id FROM task_history WHERE changed_at < ? GROUP BY task_id HAVING COUNT(*) > 1
+            ''', (before,))]
+            for task_id in task_ids:
+                entries = self.conn.execute('''
+                    SELECT id, user_id, changed_at, op, delta FROM task_history
+                    WHERE task_id=? AND changed_at < ? ORDER BY id
+                ''', (task_id, before)).fetchall()
+                state = None
+                for _, _, _, op, delta in entries:
+                    state = fold_history(state, op, delta)
+                last_id, user_id, changed_at = entries[-1][:3]
+                self.conn.execute(
+                    'DELETE FROM task_history WHERE task_id=? AND id<? AND changed_at<?', (task_id, last_id, before)
+                )
+                self.conn.execute(
+                    "UPDATE task_history SET op='I', delta=? WHERE id=?",
+                    (json.dumps(state, ensure_ascii=False), last_id)
+                )
+                removed += len(entries) - 1
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return removed
+
+    def data_version(self):
+        # Меняется, когда другое соединение (в том числе другой процесс) фиксирует изменения в базе;
+        # значение читается из общей памяти WAL и не требует чтения таблиц
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def schema_cookie(self):
+        # Счетчик изменений схемы; меняется также при восстановлении базы из снимка
+        return self.conn.execute('PRAGMA schema_version').fetchone()[0]
+
+    def last_change_id(self):
+        # Номер последней записи журнала изменений; служит курсором синхронизации
+        return self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM task_history').fetchone()[0]
+
+    def changed_task_ids(self, user_id, after_change_id, upto_change_id, limit=None):
+        # id задач пользователя, изменившихся после записи журнала after_change_id (до upto_change_id включительно).
+        # Унарный плюс исключает индекс по user_id: новых записей мало, и читается только диапазон первичного ключа.
+        # Чтение останавливается на limit различных id: вызывающему коду достаточно знать, что изменений больше.
+        # Повторы отсеиваются здесь, а не через DISTINCT, который строит временное B-дерево
+        cur = self.conn.execute('''
+            SELECT task_id FROM task_history
+            WHERE id > ? AND id <= ? AND +user_id=?
+            ORDER BY id
+        ''', (after_change_id, upto_change_id, user_id))
+        task_ids = {}
+        for (task_id,) in cur:
+            task_ids[task_id] = None
+            if limit is not None and len(task_ids) >= limit:
+                break
+        cur.close()
+        return list(task_ids)
+
+    def fetch_tasks_by_ids(self, user_id, task_ids, task_filter=None):
+        # Строки списка (с началом описания) для указанных задач, подходящих под фильтр
+        query, params = self.task_conditions(user_id, task_filter)
+        cur = self.conn.execute(f'''
+            SELECT id, title, {self.preview_column}, deadline, priority FROM tasks
+            WHERE {query} AND id IN (SELECT value FROM json_each(?))
+        ''', params + (json.dumps(list(task_ids)),))
+        return cur.fetchall()
+
+    def get_description(self, task_id, user_id):
+        # Полное описание одной задачи; список задач содержит только его начало
+        row = self.conn.execute(
+            'SELECT description FROM tasks WHERE id=? AND user_id=?', (task_id, user_id)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def task_matches(self, task_id, user_id, task_filter=None):
+        # Проверка, попадает ли задача под фильтр (поиск по первичному ключу)
+        query, params = self.task_conditions(user_id, task_filter)
+        cur = self.conn.execute(f'SELECT 1 FROM tasks WHERE {query} AND id=?', params + (task_id,))
+        return cur.fetchone() is not None
+
+    def import_tasks(self, user_id, rows, progress=None, is_cancelled=None):
+        # Массовый импорт задач одной транзакцией: строки читаются потоком и вставляются пачками.
+        # Задача с тем же заголовком, описанием и сроком не добавляется повторно: у нее обновляется приоритет,
+        # если он отличается, иначе строка пропускается. Из строк файла с одинаковым содержимым учитывается
+        # первая, остальные пропускаются: иначе приоритет задачи зависел бы от порядка строк и повторный импорт
+        # того же файла снова менял бы его. Возвращает (добавлено, обновлено, пропущено, ошибки)
+        changed = 0
+        valid = 0
+        errors = []
+        chunk = []
+        seen_hashes = set()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Под блокировкой записи новые задачи — ровно те, чей id больше последнего до импорта
+            last_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM tasks').fetchone()[0]
+            for line_num, row_data in rows:
+                try:
+                    title, description, deadline, priority = parse_task_row(row_data)
+                except ValueError as e:
+                    errors.append((line_num, str(e)))
+                else:
+                    content_hash = task_content_hash(title, description, deadline)
+                    if content_hash in seen_hashes:
+                        valid += 1
+                    else:
+                        seen_hashes.add(content_hash)
+                        chunk.append((title, description, deadline, priority, content_hash))
+
+                if len(chunk) >= self.IMPORT_CHUNK_SIZE:
+                    changed += self._upsert_tasks(user_id, chunk)
+                    valid += len(chunk)
+                    chunk = []
+                    if is_cancelled is not None and is_cancelled():
+                        raise OperationCancelled()
+                    if progress is not None:
+                        progress()
+
+            if chunk:
+                changed += self._upsert_tasks(user_id, chunk)
+                valid += len(chunk)
+            inserted = self.conn.execute('SELECT COUNT(*) FROM tasks WHERE id > ?', (last_id,)).fetchone()[0]
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        updated = changed - inserted
+        return inserted, updated, valid - changed, errors
+
+    def _upsert_tasks(self, user_id, chunk):
+        # Пачка передается одним JSON-параметром и вставляется одним запросом: накладные расходы запроса
+        # и триггеров (FTS, журнал, счетчики) приходятся на пачку, а не на строку.
+        # WHERE true нужен синтаксису: без него ON CONFLICT после SELECT ... FROM разбирается неоднозначно.
+        # Приоритет не меняется, если он уже есть у одного из дубликатов с тем же содержимым (хеш NULL):
+        # строка экспорта такого дубликата совпадает с ним, а не с владельцем хеша.
+        # Возвращает количество вставленных и обновленных строк; совпавшие задачи не изменяются
+        cur = self.conn.execute('''
+            INSERT INTO tasks (user_id, title, description, deadline, priority, content_hash)
+            SELECT ?, json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'),
+                json_extract(value, '$[3]'), json_extract(value, '$[4]')
+            FROM json_each(?) WHERE true
+            ON CONFLICT (user_id, content_hash) DO UPDATE SET priority = excluded.priority
+            WHERE priority <> excluded.priority AND NOT EXISTS (
+                SELECT 1 FROM tasks AS twin
+                WHERE twin.user_id = tasks.user_id AND twin.content_hash IS NULL
+                    AND twin.title = tasks.title AND twin.deadline = tasks.deadline
+                    AND COALESCE(twin.description, '') = COALESCE(tasks.description, '')
+                    AND twin.priority = excluded.priority
+            )
+        ''', (user_id, json.dumps(chunk, ensure_ascii=False)))
+        return cur.rowcount
+
+    def fts_match(self, task_filter):
+        # Преобразование текста фильтра в запрос FTS5: все слова, каждое с поиском по префиксу
+        if task_filter is None or not task_filter.text or not self.fts_enabled:
+            return None
+        words = re.findall(r'\w+', task_filter.text)
+        return ' '.join(f'"{word}"*' for word in words) or None
+
+    def task_conditions(self, user_id, task_filter=None, ranked=False):
+        # Построение условия WHERE для задач пользователя с учетом фильтра.
+        # При ranked=True текстовое условие не добавляется: его обеспечивает соединение с tasks_fts
+        query = 'user_id=?'
+        params = (user_id,)
+
+        if task_filter is not None:
+            match = self.fts_match(task_filter)
+            if match:
+                if not ranked:
+                    query += ' AND id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)'
+                    params += (match,)
+            elif task_filter.text:
+                query += ' AND (title LIKE ? OR description LIKE ?)'
+                params += (f'%{task_filter.text}%', f'%{task_filter.text}%')
+
+            if task_filter.priority is not None:
+                query += ' AND priority=?'
+                params += (task_filter.priority,)
+
+            if task_filter.start_date and task_filter.end_date:
+                query += ' AND deadline BETWEEN ? AND ?'
+                params += (task_filter.start_date, task_filter.end_date)
+
+        return query, params
+
+    def count_tasks(self, user_id, task_filter=None):
+        # Подсчет задач, попадающих под фильтр
+        query, params = self.task_conditions(user_id, task_filter)
+        return self.conn.execute(f'SELECT COUNT(*) FROM tasks WHERE {query}', params).fetchone()[0]
+
+    def iter_task_batches(self, user_id, task_filter=None, batch_size=5000):
+        # Потоковое чтение задач из курсора пачками фиксированного размера
+        query, params = self.task_conditions(user_id, task_filter)
+        cur = self.conn.execute(
+            f'SELECT title, description, deadline, priority FROM tasks WHERE {query} ORDER BY id',
+            params
+        )
+        try:
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            cur.close()
+
+    def fetch_tasks_page(self, user_id, task_filter=None, after=None, limit=200, sort=None):
+        # Получение очередной страницы задач по ключу последней строки предыдущей страницы (без OFFSET).
+        # sort — (столбец из SORT_COLUMNS, по убыванию); id в ключе делает порядок однозначным.
+        # Возвращает строки и ключ для следующего вызова
+        if sort is not None:
+            column, descending = sort
+            if column not in self.SORT_COLUMNS:
+                raise ValueError(f'сортировка по столбцу "{column}" не поддерживается')
+            query, params = self.task_conditions(user_id, task_filter)
+            sql, sql_params = self.sorted_page_query(query, params, column, descending, after, limit)
+            rows = self.conn.execute(sql, sql_params).fetchall()
+            index = self.SORT_COLUMNS[column]
+            return rows, ((rows[-1][index], rows[-1][0]) if rows else after)
+
+        match = self.fts_match(task_filter)
+        if match:
+            # Результаты текстового поиска упорядочены по релевантности (bm25, заголовок весомее описания).
+            # Оценки bm25 меняются при любом изменении полнотекстового индекса (в том числе задачами других
+            # пользователей), поэтому ранжирование выполняется один раз для первой страницы, а следующие
+            # страницы берутся из этого снимка id. Ключ продолжения — (id по релевантности, позиция)
+            if after is None:
+                query, params = self.task_conditions(user_id, task_filter, ranked=True)
+                cur = self.conn.execute(f'''
+                    SELECT id
+                    FROM tasks
+                    JOIN (
+                        SELECT rowid AS task_id, bm25(tasks_fts, 10.0, 1.0) AS score
+                        FROM tasks_fts WHERE tasks_fts MATCH ?
+                    ) AS m ON m.task_id = id
+                    WHERE {query}
+                    ORDER BY m.score, id
+                ''', (match,) + params)
+                after = (array('q', (row[0] for row in cur)), 0)
+            return self.ranked_page(user_id, task_filter, after, limit)
+
+        query, params = self.task_conditions(user_id, task_filter)
+        if after is not None:
+            query += ' AND id > ?'
+            params += after
+
+        cur = self.conn.execute(
+            f'SELECT id, title, {self.preview_column}, deadline, priority FROM tasks '
+            f'WHERE {query} ORDER BY id LIMIT ?',
+            params + (limit,)
+        )
+        rows = cur.fetchall()
+        return rows, ((rows[-1][0],) if rows else after)
+
+    def ranked_page(self, user_id, task_filter, after, limit):
+        # Страница из снимка ранжированных id. Задачи, удаленные или переставшие подходить под фильтр
+        # (кроме текста) после ранжирования, пропускаются, и страница добирается следующими id снимка
+        task_ids, position = after
+        query, params = self.task_conditions(user_id, task_filter, ranked=True)
+        rows = []
+        while len(rows) < limit and position < len(task_ids):
+            chunk = task_ids[position:position + limit - len(rows)]
+            position += len(chunk)
+            rows.extend(self.conn.execute(f'''
+                SELECT tasks.id, title, {self.preview_column}, deadline, priority
+                FROM json_each(?) AS ranked JOIN tasks ON tasks.id = ranked.value
+                WHERE {query}
+                ORDER BY ranked.key
+            ''', (json.dumps(chunk.tolist()),) + params).fetchall())
+        return rows, (task_ids, position)
+
+    def is_ranked(self, task_filter, sort=None):
+        # Идет ли выборка по релевантности (из снимка ранжированных id, см. fetch_tasks_page)
+        return sort is None and self.fts_match(task_filter) is not None
+
+    def sorted_page_query(self, query, params, column, descending, after, limit):
+        # Страница в порядке (column, id). Условие (column, id) > (?, ?) SQLite ищет по индексу только
+        # по первому столбцу и просматривает все задачи с тем же значением (например, тысячи задач одного
+        # приоритета), поэтому продолжение разбито на два поиска по индексу (user_id, column):
+        # то же значение с большим id и следующие значения; их объединение не больше 2 * limit строк
+        direction, compare = ('DESC', '<') if descending else ('ASC', '>')
+        columns = f'id, title, {self.preview_column}, deadline, priority'
+        if after is None:
+            return f'''
+                SELECT {columns} FROM tasks WHERE {query}
+                ORDER BY {column} {direction}, id {direction} LIMIT ?
+            ''', params + (limit,)
+        value, last_id = after
+        return f'''
+            SELECT * FROM (
+                SELECT {columns} FROM tasks WHERE {query} AND {column} = ? AND id {compare} ?
+                ORDER BY id {direction} LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT {columns} FROM tasks WHERE {query} AND {column} {compare} ?
+                ORDER BY {column} {direction}, id {direction} LIMIT ?
+            )
+            ORDER BY {column} {direction}, id {direction} LIMIT ?
+        ''', params + (value, last_id, limit) + params + (value, limit, limit)
+
+    def fetch_deadlines_page(self, user_id, after, limit=500):
+        # Ближайшие сроки задач по возрастанию (deadline, id) после ключа after; идет по индексу (user_id, deadline)
+        return self.conn.execute('''
+            SELECT id, title, deadline FROM tasks
+            WHERE user_id=? AND (deadline, id) > (?, ?)
+            ORDER BY deadline, id
+            LIMIT ?
+        ''', (user_id,) + tuple(after) + (limit,)).fetchall()